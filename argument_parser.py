@@ -1,8 +1,80 @@
+import os
 import argparse
+import functools
 
+from utils.paths.base import DEFAULT_PATHS
 
-def parse_args():
-    """Argument parser for brain analysis script"""
+# Prefix for environment variables (or .env entries) that override CLI
+# defaults, e.g. NEUROLLM_SPECIES=human or NEUROLLM_JUSTIFY=1
+ENV_PREFIX = "NEUROLLM_"
+
+SPECIES_CHOICES = ("human", "macaque", "mouse")
+EMBEDDING_PROVIDER_CHOICES = ("openai", "local")
+
+# Options with choices and a NEUROLLM_* default. argparse only checks
+# choices for values given on the command line, so parse_args() checks
+# the environment-sourced defaults against the same tuples
+_ENV_CHOICES = {
+    "species": SPECIES_CHOICES,
+    "embedding_provider": EMBEDDING_PROVIDER_CHOICES,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _env_settings() -> dict:
+    """
+    Collect NEUROLLM_* settings from the .env file and the environment, with
+    the environment taking precedence. Read once per process
+
+    Returns:
+        * Dict of option dest (e.g. 'atlas_name') to string value
+    """
+    values = {}
+    env_file = DEFAULT_PATHS["env_file"]
+    if os.path.exists(env_file):
+        from dotenv import dotenv_values
+
+        values.update(dotenv_values(env_file))
+    values.update(os.environ)
+    return {
+        key[len(ENV_PREFIX):].lower(): value
+        for key, value in values.items()
+        if key.startswith(ENV_PREFIX) and value is not None
+    }
+
+
+def _env_default(name: str, default):
+    """
+    Default for an option, overridden by NEUROLLM_<NAME> if set. String
+    values are converted by argparse through the option's type
+
+    Args:
+        * name (str): Option name without leading dashes (e.g. 'atlas-name')
+        * default: Default used when no override is set
+
+    Returns:
+        * The override string, or default
+    """
+    return _env_settings().get(name.replace("-", "_"), default)
+
+
+def _env_flag(name: str) -> bool:
+    """
+    Default for a store_true flag, enabled by NEUROLLM_<NAME>=1/true/yes
+
+    Args:
+        * name (str): Flag name without leading dashes (e.g. 'justify')
+
+    Returns:
+        * True if the override is set to a truthy value, else False
+    """
+    value = _env_default(name, "")
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@functools.lru_cache(maxsize=1)
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for brain analysis script (once)"""
     parser = argparse.ArgumentParser(description="Brain Analysis with LLMs")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -10,18 +82,18 @@ def parse_args():
     analysis_parent = argparse.ArgumentParser(add_help=False)
     analysis_parent.add_argument(
         "--species",
-        default=None,
-        choices=["human", "macaque", "mouse"],
+        default=_env_default("species", None),
+        choices=SPECIES_CHOICES,
         help="Species to analyze (required)",
     )
     analysis_parent.add_argument(
         "--regions",
-        default=None,
+        default=_env_default("regions", None),
         help="Comma-separated brain regions (default: all regions in atlas)",
     )
     analysis_parent.add_argument(
         "--models",
-        default="dummy",
+        default=_env_default("models", "dummy"),
         help="Comma-separated OpenRouter model IDs (e.g., "
         "'openai/gpt-4o-mini,anthropic/claude-3.5-sonnet'), "
         "'braingpt', or 'dummy'. Use 'list-models' command to see "
@@ -29,29 +101,36 @@ def parse_args():
     )
     analysis_parent.add_argument(
         "--prompt-template-name",
-        default="default",
+        default=_env_default("prompt-template-name", "default"),
         help="Prompt template name",
     )
     analysis_parent.add_argument(
         "--separate-hemispheres",
         action="store_true",
+        default=_env_flag("separate-hemispheres"),
         help="Process left and right hemispheres separately",
     )
     analysis_parent.add_argument(
         "--skip-visualization",
         action="store_true",
+        default=_env_flag("skip-visualization"),
         help="Skip visualizations",
     )
     analysis_parent.add_argument(
         "--skip-raw-saving",
         action="store_true",
+        default=_env_flag("skip-raw-saving"),
         help="Clean up raw data files",
     )
-    analysis_parent.add_argument("--workers", type=int, default=4)
+    analysis_parent.add_argument(
+        "--workers",
+        type=int,
+        default=_env_default("workers", 4),
+    )
     analysis_parent.add_argument(
         "--max-tokens",
         type=int,
-        default=None,
+        default=_env_default("max-tokens", None),
         help=(
             "Maximum tokens per response (default: 512 with --justify, 256 "
             "otherwise"
@@ -60,12 +139,32 @@ def parse_args():
     analysis_parent.add_argument(
         "--justify",
         action="store_true",
+        default=_env_flag("justify"),
         help="Ask model to provide a justification alongside its answer",
     )
+    analysis_parent.add_argument(
+        "--json-mode",
+        action="store_true",
+        default=_env_flag("json-mode"),
+        help=(
+            "Request JSON structured output from OpenRouter models instead of "
+            "parsing free-form text (cannot be combined with --justify)"
+        ),
+    )
+    analysis_parent.add_argument(
+        "--stream-early-stop",
+        action="store_true",
+        default=_env_flag("stream-early-stop"),
+        help=(
+            "Stream replies and stop reading once the function list, "
+            "probability or ranking is complete (ignored with --justify or "
+            "--json-mode)"
+        ),
+    )
     analysis_parent.add_argument(
         "--retest",
         type=int,
-        default=1,
+        default=_env_default("retest", 1),
         help=(
             "Number of times to repeat each query and average results "
             "(default: 1, no retest)"
@@ -74,9 +173,34 @@ def parse_args():
     analysis_parent.add_argument(
         "--temperature",
         type=float,
-        default=0.0,
+        default=_env_default("temperature", 0.0),
         help="Temperature for model querying (default 0.0)",
     )
+    analysis_parent.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=_env_flag("no-cache"),
+        help="Disable the on-disk response/embedding cache",
+    )
+    analysis_parent.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=_env_default("cache-ttl", None),
+        help=(
+            "Seconds before cached responses expire, must be positive "
+            "(default: never expire)"
+        ),
+    )
+    analysis_parent.add_argument(
+        "--prompt-batch-size",
+        type=int,
+        default=_env_default("prompt-batch-size", 1),
+        help=(
+            "Fuse up to this many concurrent prompts per OpenRouter model "
+            "into one request (default: 1, no fusing). Raise --workers to "
+            "fill batches"
+        ),
+    )
 
     # List models
     list_models_parser = subparsers.add_parser(
@@ -100,13 +224,13 @@ def parse_args():
     )
     top_functions_parser.add_argument(
         "--atlas-name",
-        default=None,
+        default=_env_default("atlas-name", None),
         help="Atlas name (required when --regions is not provided)",
     )
     top_functions_parser.add_argument(
         "--embedding-provider",
-        default="openai",
-        choices=["openai", "local"],
+        default=_env_default("embedding-provider", "openai"),
+        choices=EMBEDDING_PROVIDER_CHOICES,
         help="Embedding provider for top-functions analysis. "
         "'openai' uses text-embedding-3-large (requires OPENAI_API_KEY). "
         "'local' uses BAAI/bge-large-en-v1.5 via sentence-transformers "
@@ -115,7 +239,7 @@ def parse_args():
     top_functions_parser.add_argument(
         "--consensus-threshold",
         type=float,
-        default=0.80,
+        default=_env_default("consensus-threshold", 0.80),
         help=(
             "Cosine similarity threshold for semantic clustering when "
             "computing consensus functions across retests (default: 0.80)"
@@ -130,7 +254,7 @@ def parse_args():
     )
     query_parser.add_argument(
         "--atlas-name",
-        default=None,
+        default=_env_default("atlas-name", None),
         help="Atlas name (required when --regions is not provided)",
     )
     query_parser.add_argument(
@@ -151,7 +275,7 @@ def parse_args():
     )
     rank_parser.add_argument(
         "--atlas-name",
-        default=None,
+        default=_env_default("atlas-name", None),
         help=(
             "Atlas name (required when --regions and --pairs are not provided)"
         ),
@@ -177,8 +301,35 @@ def parse_args():
     )
     test_parser.add_argument(
         "--atlas-name",
-        default=None,
+        default=_env_default("atlas-name", None),
         help="Atlas name (required when --regions is not provided)",
     )
 
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv=None):
+    """
+    Parse arguments for brain analysis script. Defaults can be overridden
+    with NEUROLLM_* variables in the environment or .env file, and explicit
+    CLI flags override both
+
+    Args:
+        * argv (list | None): Arguments to parse (default: sys.argv[1:])
+
+    Returns:
+        * argparse.Namespace of parsed arguments
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # CLI values were already checked, so a bad value here came from the
+    # environment or .env file
+    for dest, choices in _ENV_CHOICES.items():
+        value = getattr(args, dest, None)
+        if value is not None and value not in choices:
+            parser.error(
+                f"{ENV_PREFIX}{dest.upper()}={value!r} is not one of: "
+                f"{', '.join(choices)}"
+            )
+    return args
@@ -5,18 +5,15 @@ from types import SimpleNamespace
 from argument_parser import parse_args
 
 import numpy as np
-import torch
-
-from dotenv import load_dotenv
 
 from utils.brain_analyser import BrainAnalyser
 from utils.api_clients import APIClientManager
+from utils.misc.api_keys import load_api_keys
 from utils.misc.model_listing import list_available_models
 from utils.core.function_registry import (
     load_function_group,
     load_functions,
 )
-from utils.paths.base import DEFAULT_PATHS
 from utils.misc.atlas import (
     load_regions_for_species,
     validate_analysis_inputs,
@@ -107,18 +104,30 @@ def _resolve_functions(args) -> list:
     return functions
 
 
+def _seed_torch(seed: int):
+    """
+    Seed torch for reproducible local model generation
+
+    Args:
+        * seed (int): Seed value
+    """
+    import torch
+
+    torch.manual_seed(seed)
+    torch.cuda.manual_seed_all(seed)
+    torch.backends.cudnn.deterministic = True
+    torch.backends.cudnn.benchmark = False
+
+
 def main():
     """Main LLM brain analysis script"""
     # Set global seeds for reproducibility
     random.seed(42)
     np.random.seed(42)
-    torch.manual_seed(42)
-    torch.cuda.manual_seed_all(42)
-    torch.backends.cudnn.deterministic = True
-    torch.backends.cudnn.benchmark = False
 
-    # Load environment variables from .env file
-    load_dotenv(DEFAULT_PATHS["env_file"])
+    # Load environment variables from .env file (SEED, HF_* and SDK settings
+    # are read from os.environ)
+    load_api_keys()
 
     # Parse command-line arguments
     args = parse_args()
@@ -131,6 +140,10 @@ def main():
     # Determine models to use based on command
     models_input = "dummy" if args.command == "test" else args.models
 
+    # Only BrainGPT runs through torch, so only import and seed it then
+    if "braingpt" in [m.strip() for m in models_input.split(",")]:
+        _seed_torch(seed=42)
+
     # Validate we have sufficient region/atlas information to proceed
     validate_analysis_inputs(args=args)
 
@@ -161,6 +174,10 @@ def main():
                 else None
             ),
             max_tokens=args.max_tokens,
+            use_cache=not args.no_cache,
+            cache_ttl=args.cache_ttl,
+            workers=1 if args.command == "test" else args.workers,
+            prompt_batch_size=args.prompt_batch_size,
         )
         model_names = client_manager.model_names
         logger.info(f"Using models: {', '.join(model_names)}")
@@ -185,6 +202,8 @@ def main():
         prompt_template_name=args.prompt_template_name,
         client_manager=client_manager,
         justify=args.justify,
+        json_mode=args.json_mode,
+        stream_early_stop=args.stream_early_stop,
         retest=args.retest,
         temperature=args.temperature,
         consensus_threshold=getattr(args, "consensus_threshold", 0.80),
@@ -194,7 +213,9 @@ def main():
     try:
         if args.command == "top-functions":
             logger.info(f"Running functions analysis for {args.species}...")
-            analyser = BrainAnalyser(config=config)
+            analyser = BrainAnalyser(
+                config=config, executor=client_manager.executor
+            )
             analyser.analyze_functions()
 
         elif args.command == "query-functions":
@@ -203,7 +224,9 @@ def main():
             logger.info(
                 f"Running probabilities analysis for {args.species}..."
             )
-            analyser = BrainAnalyser(config=config)
+            analyser = BrainAnalyser(
+                config=config, executor=client_manager.executor
+            )
             analyser.analyze_probabilities()
 
         elif args.command == "rank-pairs":
@@ -213,12 +236,16 @@ def main():
             logger.info(
                 f"Running rankings analysis for {args.species}..."
             )
-            analyser = BrainAnalyser(config=config)
+            analyser = BrainAnalyser(
+                config=config, executor=client_manager.executor
+            )
             analyser.analyze_rankings()
 
         elif args.command == "test":
             logger.info("Running test workflow...")
-            analyser1 = BrainAnalyser(config=config)
+            analyser1 = BrainAnalyser(
+                config=config, executor=client_manager.executor
+            )
 
             logger.info("Testing functions analysis...")
             analyser1.analyze_functions()
@@ -231,7 +258,9 @@ def main():
                 "consciousness",
             ]
 
-            analyser2 = BrainAnalyser(config=config)
+            analyser2 = BrainAnalyser(
+                config=config, executor=client_manager.executor
+            )
             analyser2.analyze_probabilities()
             logger.success("Probabilities test completed")
 
@@ -240,7 +269,9 @@ def main():
             test_regions = config.regions[:3]
             config.pairs = list(combinations(test_regions, 2))
 
-            analyser3 = BrainAnalyser(config=config)
+            analyser3 = BrainAnalyser(
+                config=config, executor=client_manager.executor
+            )
             analyser3.analyze_rankings()
             logger.success("Rankings test completed")
 
@@ -260,6 +291,8 @@ def main():
     except Exception as e:
         logger.error_status(f"Error during analysis: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        client_manager.close()
 
 
 if __name__ == "__main__":
@@ -1,19 +1,22 @@
 import os
+import re
+import json
 import time
-import torch
+import logging
 import random
+import threading
+import numpy as np
 
-from typing import Dict, List, Callable, Any
-
-import openai
-
-from huggingface_hub import model_info
-from huggingface_hub.utils import GatedRepoError, RepositoryNotFoundError
-from peft import PeftModel
-from sentence_transformers import SentenceTransformer
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Dict, List, Callable, Any, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from utils.misc.api_keys import load_api_keys
 from utils.misc.logging_setup import logger
+from utils.misc.prompt_batcher import PromptBatcher, RequestBatcher
+from utils.misc.response_cache import ResponseCache
+from utils.paths.base import DEFAULT_PATHS
 from utils.misc.variables import (
     OPENROUTER_BASE_URL,
     BRAINGPT_CONFIG,
@@ -21,6 +24,125 @@ from utils.misc.variables import (
     EMBEDDING_DIMS,
 )
 
+# Upper bound on any single retry delay, in seconds
+_MAX_BACKOFF = 60.0
+
+# HTTP statuses that will fail the same way on every retry
+_NON_RETRYABLE_STATUS = frozenset({400, 401, 403, 404, 422})
+
+# Maximum inputs per OpenAI embeddings request
+_OPENAI_EMBEDDING_BATCH = 2048
+
+
+# Durations like "1s", "6m0s" or "250ms" in x-ratelimit-reset-* headers
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a rate-limit reset duration into seconds
+
+    Args:
+        * value: Header value such as "20ms", "1.5s" or "6m0s"
+
+    Returns:
+        * Seconds, or None if the value is not a duration
+    """
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """
+    Extract the server-requested wait from a rate-limit error, if any.
+    Checks retry-after-ms, Retry-After, then (for a 429) the
+    x-ratelimit-reset-requests and x-ratelimit-reset-tokens headers, taking
+    the longer of the two
+
+    Args:
+        * e: Exception raised by a provider SDK
+
+    Returns:
+        * Seconds to wait, or None if no header gives one
+    """
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    try:
+        return float(headers.get("retry-after-ms")) / 1000
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+
+    # The reset headers come with every response, so they only mean "wait"
+    # on a 429
+    if getattr(e, "status_code", None) != 429:
+        return None
+    resets = [
+        _parse_duration(headers[name])
+        for name in (
+            "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens",
+        )
+        if headers.get(name)
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+# Dummy model answers, chosen by keywords in the prompt
+_DUMMY_FUNCTIONS = (
+    "sensory processing",
+    "motor control",
+    "memory formation",
+    "emotional regulation",
+    "language processing",
+    "attention control",
+    "decision making",
+    "spatial navigation",
+    "auditory processing",
+    "visual processing",
+    "pain perception",
+    "reward processing",
+    "fear response",
+    "learning",
+    "cognition",
+)
+
+
+def _dummy_rank(rng: np.random.Generator) -> str:
+    return str(rng.integers(1, 3))
+
+
+def _dummy_probability(rng: np.random.Generator) -> str:
+    return f"{rng.uniform(0.1, 0.9):.2f}"
+
+
+def _dummy_functions(rng: np.random.Generator) -> str:
+    picks = rng.choice(len(_DUMMY_FUNCTIONS), size=5, replace=False)
+    return f"[{', '.join(_DUMMY_FUNCTIONS[i] for i in picks)}]"
+
+
+# One case-insensitive pass finds every prompt keyword; answers are picked in
+# _DUMMY_PRIORITY order so ranking prompts win over probability ones
+_DUMMY_RE = re.compile(
+    r"(?P<rank>which of two brain regions|region 1:)"
+    r"|(?P<probability>probability)"
+    r"|(?P<functions>top 5 functions)"
+    r"|(?P<justify>justification)",
+    re.IGNORECASE,
+)
+_DUMMY_PRIORITY = (
+    ("rank", _dummy_rank),
+    ("probability", _dummy_probability),
+    ("functions", _dummy_functions),
+)
+
 
 class APIClientManager:
     """Manages API clients for OpenRouter, BrainGPT, and Dummy providers"""
@@ -30,6 +152,10 @@ class APIClientManager:
         models: str = "dummy",
         embedding_provider: str = None,
         max_tokens: int = 256,
+        use_cache: bool = True,
+        cache_ttl: float = None,
+        workers: int = 4,
+        prompt_batch_size: int = 1,
     ):
         """
         Initialize API clients for all needed providers
@@ -43,25 +169,129 @@ class APIClientManager:
                 'local' uses BAAI/bge-large-en-v1.5 via sentence-transformers
             * max_tokens (int): Maximum tokens to generate per response
                 (default: 256)
+            * use_cache (bool): Cache responses and embeddings on disk so
+                repeated queries skip the model call (default: True)
+            * cache_ttl (float | None): Seconds before a cached entry expires,
+                must be positive. None keeps entries forever
+            * workers (int): Maximum number of in-flight OpenRouter requests
+                (default: 4). BrainGPT is always limited to one at a time
+            * prompt_batch_size (int): Fuse up to this many concurrent
+                OpenRouter prompts for the same model into one request
+                (default: 1, no fusing)
 
         Raises:
             * Exception if any client fails to initialize
         """
         self.clients: Dict[str, Any] = {}
-        self.model_names: List[str] = [m.strip() for m in models.split(",")]
+        self._client_factories: Dict[str, Callable[[], Any]] = {
+            "http": self._make_http_client,
+        }
+        # Re-entrant: client factories may build the shared HTTP pool
+        self._client_lock = threading.RLock()
+        # Deduplicated in one pass, keeping the order given on the CLI
+        self.model_names: List[str] = list(
+            dict.fromkeys(m.strip() for m in models.split(",") if m.strip())
+        )
         self.embedding_provider = embedding_provider
         self.max_tokens = max_tokens
+        self.cache = (
+            ResponseCache(
+                path=f"{DEFAULT_PATHS['cache_dir']}/responses.sqlite",
+                ttl=cache_ttl,
+            )
+            if use_cache
+            else None
+        )
+        self.workers = workers
+
+        # Shared pool for region/pair tasks, reused by every analysis run
+        # through this manager. query_many keeps its own pool so tasks on
+        # this executor never wait on work queued behind them
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="neurollm"
+        )
+
+        # Single seeded RNG for dummy answers and embeddings (SEED env var,
+        # default 42 like main.py)
+        self._rng = np.random.default_rng(int(os.environ.get("SEED", 42)))
+
+        # Per-provider concurrency limits, shared by every thread that queries
+        # through this manager
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {
+            "openrouter": threading.BoundedSemaphore(max(1, workers)),
+            "braingpt": threading.BoundedSemaphore(1),
+        }
+
+        # Monotonic time before which each provider should not be called
+        # again, shared across workers after a rate limit
+        self._provider_cooldown: Dict[str, float] = defaultdict(float)
+        self._cooldown_lock = threading.Lock()
+        self._closing = threading.Event()
+
+        # Optional fusing of concurrent OpenRouter prompts into one request
+        self._batcher = (
+            PromptBatcher(
+                send_batch=self._query_openrouter_fused,
+                batch_size=prompt_batch_size,
+            )
+            if prompt_batch_size > 1
+            else None
+        )
+
+        # Coalesce embedding calls from concurrent tasks into one request
+        self._embedding_batcher = (
+            RequestBatcher(
+                send_batch=self._embed_coalesced,
+                batch_size=workers,
+                window=0.02,
+            )
+            if embedding_provider in ("openai", "local") and workers > 1
+            else None
+        )
+
+        # Requests currently being sent, keyed like the response cache
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+        # Per-model (provider, cooldown key), filled once per model
+        self._routes: Dict[str, Tuple[str, str]] = {}
+        for model_name in self.model_names:
+            self._route(model_name)
+
+        # Providers needed by the models and embedding provider, resolved once
+        self.providers = frozenset(self._needed_providers())
+
+        self.initialized = False
+        self.init_clients()
+
+    def init_clients(self):
+        """
+        Initialize the clients needed by the configured models. Safe to call
+        more than once; later calls are no-ops
+
+        Raises:
+            * Exception if any client fails to initialize
+        """
+        if self.initialized:
+            return
+
+        # Dummy-only runs (e.g. the test command) need no keys or SDKs, so
+        # skip loading .env and registering any clients
+        needed_providers = self.providers
+        if needed_providers <= {"dummy"}:
+            self.initialized = True
+            return
 
         try:
-            if any(m not in LOCAL_MODELS for m in self.model_names):
+            if "openrouter" in needed_providers:
                 self._init_openrouter()
 
-            if embedding_provider == "openai":
+            if "openai_embeddings" in needed_providers:
                 self._init_openai_embeddings()
-            elif embedding_provider == "local":
+            elif "local_embeddings" in needed_providers:
                 self._init_local_embeddings()
 
-            if "braingpt" in self.model_names:
+            if "braingpt" in needed_providers:
                 self._validate_braingpt_access()
                 self._init_braingpt()
 
@@ -71,14 +301,35 @@ class APIClientManager:
             )
             raise
 
+        self.initialized = True
+
+    def _needed_providers(self) -> set:
+        """
+        Resolve the set of providers the configured models and embedding
+        provider need
+
+        Returns:
+            * Set of provider names ('openrouter', 'braingpt', 'dummy',
+                'openai_embeddings', 'local_embeddings')
+        """
+        providers = {self._route(m)[0] for m in self.model_names}
+        if self.embedding_provider in ("openai", "local"):
+            providers.add(f"{self.embedding_provider}_embeddings")
+        return providers
+
     def query_model(
         self,
         model_name: str,
         prompt: str,
         temperature: float = None,
+        trial: int = 0,
+        response_schema: Dict[str, Any] = None,
+        stop_pattern: re.Pattern = None,
     ) -> str:
         """
-        Query a model by name
+        Query a model by name. Responses from real models are served from the
+        on-disk cache when the same request was made before, and identical
+        requests made concurrently share a single provider call
 
         Args:
             * model_name (str): OpenRouter model ID,
@@ -86,21 +337,113 @@ class APIClientManager:
             * prompt (str): Prompt to send to the model
             * temperature (float | None): Override temperature.
                 None uses default (0 for deterministic).
+            * trial (int): Retest trial index. Part of the cache key so that
+                retest trials are not collapsed into a single response
+            * response_schema (dict | None): JSON schema (see
+                RESPONSE_SCHEMAS) requesting structured output from OpenRouter
+                models. The response is then a JSON string
+            * stop_pattern (re.Pattern | None): Stream the OpenRouter reply
+                and stop reading once the visible text matches this pattern
+
+        Returns:
+            * response (str): Model response
+        """
+        if model_name == "dummy":
+            return self._query_dummy(prompt=prompt)
+
+        key_parts = [
+            "query", model_name, prompt, temperature,
+            self.max_tokens, trial,
+            response_schema["name"] if response_schema else None,
+        ]
+        # Early-stopped replies are truncated, so they are cached apart from
+        # full replies (full-reply keys are unchanged)
+        if stop_pattern is not None:
+            key_parts += ["stream-early-stop", stop_pattern.pattern]
+        key = ResponseCache.make_key(*key_parts)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Single-flight: identical requests already in flight share one call
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            response = self._query_uncached(
+                model_name=model_name,
+                prompt=prompt,
+                temperature=temperature,
+                response_schema=response_schema,
+                stop_pattern=stop_pattern,
+            )
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            if self.cache is not None:
+                self.cache.set(key, response)
+            future.set_result(response)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        return response
+
+    def _query_uncached(
+        self,
+        model_name: str,
+        prompt: str,
+        temperature: float,
+        response_schema: Dict[str, Any],
+        stop_pattern: re.Pattern,
+    ) -> str:
+        """
+        Send a query to the model's provider (no caching or de-duplication)
+
+        Args:
+            * model_name (str): OpenRouter model ID or 'braingpt'
+            * prompt (str): Prompt to send to the model
+            * temperature (float | None): Override temperature
+            * response_schema (dict | None): JSON schema for structured output
+            * stop_pattern (re.Pattern | None): Streaming early-stop pattern
 
         Returns:
             * response (str): Model response
         """
+        provider, cooldown_key = self._route(model_name)
         try:
-            if model_name == "dummy":
-                return self._query_dummy(prompt=prompt)
-            elif model_name == "braingpt":
-                return self._query_braingpt(prompt=prompt)
+            if (
+                provider == "openrouter"
+                and self._batcher is not None
+                and response_schema is None
+                and stop_pattern is None
+            ):
+                # Fused requests take the provider semaphore when sent.
+                # Structured and streamed (early-stop) queries go alone
+                return self._batcher.submit(
+                    model_name, prompt, temperature
+                ).result()
+            elif provider == "braingpt":
+                with self._semaphores["braingpt"]:
+                    return self._query_braingpt(prompt=prompt)
             else:
                 return self.retry_with_backoff(
                     self._query_openrouter,
                     model_name,
                     prompt,
                     temperature,
+                    None,
+                    response_schema,
+                    stop_pattern,
+                    provider=cooldown_key,
+                    limit=self._semaphores["openrouter"],
                 )
         except Exception as e:
             error_msg = (
@@ -109,77 +452,275 @@ class APIClientManager:
             logger.error_status(error_msg, exc_info=True)
             raise
 
+    def _route(self, model_name: str) -> Tuple[str, str]:
+        """
+        Look up where a model's queries go. Routes for the configured models
+        are precomputed at init; others are resolved on demand
+
+        Args:
+            * model_name (str): OpenRouter model ID, 'braingpt', or 'dummy'
+
+        Returns:
+            * Tuple of (provider, cooldown key)
+        """
+        route = self._routes.get(model_name)
+        if route is None:
+            provider = (
+                model_name if model_name in LOCAL_MODELS else "openrouter"
+            )
+            route = (provider, model_name.split("/")[0])
+            self._routes[model_name] = route
+        return route
+
+    def query_many(
+        self,
+        jobs: List[Dict[str, Any]],
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        Run several queries concurrently. Per-provider limits still apply, so
+        calls to different providers overlap while each provider stays
+        within its own limit
+
+        Args:
+            * jobs: List of keyword-argument dicts for query_model
+            * return_exceptions: If True, a failed job's exception is returned
+                in its slot instead of being raised
+
+        Returns:
+            * List of responses, in the same order as jobs
+        """
+        def _run(job):
+            try:
+                return self.query_model(**job)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        if len(jobs) <= 1:
+            return [_run(job) for job in jobs]
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(jobs), max(1, self.workers))
+        ) as executor:
+            return list(executor.map(_run, jobs))
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Return response/embedding cache hit and miss counts
+
+        Returns:
+            * Dict with memory_hits, disk_hits and misses (empty if the cache
+                is disabled)
+        """
+        return self.cache.stats() if self.cache is not None else {}
+
+    def close(self):
+        """
+        Wake any retry backoffs, then shut down the shared executor and close
+        the shared HTTP pool and response cache
+        """
+        self._closing.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        stats = self.cache_stats()
+        if any(stats.values()):
+            logger.info(
+                "Cache: {memory_hits} memory hits, {disk_hits} disk hits, "
+                "{misses} misses".format(**stats)
+            )
+        if "http" in self.clients:
+            self.clients["http"].close()
+        if self.cache is not None:
+            self.cache.close()
+
     def retry_with_backoff(
         self,
         func: Callable,
         *args,
         max_retries: int = 5,
         initial_delay: int = 2,
+        provider: str = None,
+        limit: threading.Semaphore = None,
     ):
         """
-        Retry a function with exponential backoff
+        Retry a function with full-jitter exponential backoff. Client errors
+        (400/401/403/404/422) are raised immediately. When a provider is
+        given, a rate limit on one call pauses every worker calling that
+        provider until the cooldown has passed. The concurrency limit is only
+        held while calling func, so workers backing off free their slot
 
         Args:
             * func: Function to retry
             * *args: Arguments to pass to func
             * max_retries: Maximum number of retry attempts
-            * initial_delay: Initial backoff delay in seconds
+            * initial_delay: Backoff window in seconds for the first retry,
+                doubling per attempt (capped at 60 s)
+            * provider: Key for the shared cooldown (e.g. the upstream
+                provider of an OpenRouter model ID)
+            * limit: Semaphore bounding concurrent calls to func
 
         Returns:
             * The result from the function
         """
         for attempt in range(1, max_retries + 1):
+            # Honour a cooldown set by another worker's rate limit
+            if provider is not None:
+                wait = self._provider_cooldown[provider] - time.monotonic()
+                if wait > 0:
+                    self._sleep(wait)
+
             try:
-                return func(*args)
+                with limit or nullcontext():
+                    return func(*args)
             except Exception as e:
+                # Tracebacks are left to the caller (query_model logs one on
+                # final failure); retries only log a one-line summary
                 if attempt >= max_retries:
                     logger.error_status(
                         f"Maximum retries ({max_retries}) exceeded. "
-                        f"Last error: {str(e)}",
-                        exc_info=True,
+                        f"Last error: {type(e).__name__}: {e}"
                     )
                     raise
 
-                # Add jitter to avoid thundering herd
-                delay = initial_delay * (2 ** (attempt - 1)) + random.uniform(
-                    0, 1
-                )
+                # Client errors (bad request, auth, missing model) will not
+                # succeed on retry
+                status = getattr(e, "status_code", None)
+                if status in _NON_RETRYABLE_STATUS:
+                    logger.error_status(
+                        f"Non-retryable API error: {type(e).__name__}: {e}"
+                    )
+                    raise
+
+                # Full jitter spreads retries over the whole backoff window
+                cap = initial_delay * (1 << (attempt - 1))
+                delay = random.uniform(0, min(cap, _MAX_BACKOFF))
+                # A server-requested wait replaces the backoff guess, with a
+                # little jitter so workers don't all resume at once
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    delay = min(
+                        retry_after + random.uniform(0, 1), _MAX_BACKOFF
+                    )
+
                 logger.warning_status(
-                    f"API error: {str(e)}. Retrying in {delay:.1f}s "
-                    f"(attempt {attempt}/{max_retries})..."
+                    f"API error: {type(e).__name__}: {e}. Retrying in "
+                    f"{delay:.1f}s (attempt {attempt}/{max_retries})..."
                 )
-                time.sleep(delay)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Retry traceback", exc_info=True)
+
+                # Share rate limits with every worker on this provider; the
+                # cooldown wait at the top of the loop then does the sleep
+                rate_limited = status == 429 or retry_after is not None
+                if provider is not None and rate_limited:
+                    with self._cooldown_lock:
+                        self._provider_cooldown[provider] = max(
+                            self._provider_cooldown[provider],
+                            time.monotonic() + delay,
+                        )
+                else:
+                    self._sleep(delay)
+
+    def _sleep(self, seconds: float):
+        """
+        Sleep for a backoff delay, waking early if the manager is closed
+
+        Args:
+            * seconds: Delay in seconds
+
+        Raises:
+            * RuntimeError if close() is called while sleeping
+        """
+        if self._closing.wait(seconds):
+            raise RuntimeError("Client manager closed during retry backoff")
 
     # -------------------------------------------------------------------------
     # Initialisation helpers
     # -------------------------------------------------------------------------
 
+    def _get_client(self, name: str) -> Any:
+        """
+        Return a client, constructing it on first use. Construction is
+        guarded by a lock so concurrent workers build each client once
+
+        Args:
+            * name (str): Client name registered by init_clients()
+
+        Returns:
+            * The client object
+        """
+        client = self.clients.get(name)
+        if client is None:
+            with self._client_lock:
+                client = self.clients.get(name)
+                if client is None:
+                    client = self._client_factories[name]()
+                    self.clients[name] = client
+        return client
+
+    def _make_http_client(self):
+        """
+        Build the HTTP connection pool shared by every SDK client, so
+        connections (and TLS sessions) are reused across requests and
+        providers. HTTP/2 is used when the optional h2 package is installed
+
+        Returns:
+            * httpx.Client
+        """
+        import httpx
+
+        try:
+            import h2  # noqa: F401
+
+            http2 = True
+        except ImportError:
+            http2 = False
+
+        return httpx.Client(
+            http2=http2,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max(64, 2 * self.workers),
+                max_keepalive_connections=max(32, self.workers),
+            ),
+        )
+
     def _init_openrouter(self):
         """
-        Validate OPENROUTER_API_KEY and create the OpenRouter client. Uses the
-        OpenAI SDK with a base_url override
+        Validate OPENROUTER_API_KEY and register the OpenRouter client
+        factory. Uses the OpenAI SDK with a base_url override
         """
-        openrouter_key = os.environ.get("OPENROUTER_API_KEY")
+        openrouter_key = load_api_keys()["OPENROUTER_API_KEY"]
         if not openrouter_key:
             raise ValueError(
                 "Missing OPENROUTER_API_KEY in .env file. "
                 "Get one at https://openrouter.ai/keys"
             )
-        self.clients["openrouter"] = openai.OpenAI(
-            base_url=OPENROUTER_BASE_URL,
-            api_key=openrouter_key,
-        )
-        logger.info("Initialized OpenRouter client")
+
+        def _make_client():
+            import openai
+
+            client = openai.OpenAI(
+                base_url=OPENROUTER_BASE_URL,
+                api_key=openrouter_key,
+                http_client=self._get_client("http"),
+            )
+            logger.info("Initialized OpenRouter client")
+            return client
+
+        self._client_factories["openrouter"] = _make_client
 
     def _init_openai_embeddings(self):
         """
-        Validate OPENAI_API_KEY and create the OpenAI embeddings client.
+        Validate OPENAI_API_KEY and register the OpenAI embeddings client
+        factory.
 
         Note: embeddings cannot be routed through OpenRouter - a direct
         OpenAI key is required (only used for top-functions command, and can be
         bypassed with --embedding-provider local)
         """
-        openai_key = os.environ.get("OPENAI_API_KEY")
+        openai_key = load_api_keys()["OPENAI_API_KEY"]
         if not openai_key:
             raise ValueError(
                 "Missing OPENAI_API_KEY in .env file. "
@@ -188,29 +729,48 @@ class APIClientManager:
                 "Get one at https://platform.openai.com/account/api-keys. "
                 "Alternatively, use --embedding-provider local."
             )
-        self.clients["openai_embeddings"] = openai.OpenAI(api_key=openai_key)
-        logger.info("Initialized OpenAI embeddings client")
+
+        def _make_client():
+            import openai
+
+            client = openai.OpenAI(
+                api_key=openai_key, http_client=self._get_client("http"),
+            )
+            logger.info("Initialized OpenAI embeddings client")
+            return client
+
+        self._client_factories["openai_embeddings"] = _make_client
 
     def _init_local_embeddings(self):
         """
-        Load BAAI/bge-large-en-v1.5 via sentence-transformers.
-        Weights are downloaded on first use and cached locally in
-        ~/.cache/huggingface/hub/ by the huggingface_hub library
+        Register a factory that loads BAAI/bge-large-en-v1.5 via
+        sentence-transformers. Weights are downloaded on first use and cached
+        locally in ~/.cache/huggingface/hub/ by the huggingface_hub library
         """
-        self.clients["local_embeddings"] = SentenceTransformer(
-            "BAAI/bge-large-en-v1.5"
-        )
-        logger.info(
-            "Initialized local embeddings model (BAAI/bge-large-en-v1.5)"
-        )
+        def _make_client():
+            from sentence_transformers import SentenceTransformer
+
+            client = SentenceTransformer("BAAI/bge-large-en-v1.5")
+            logger.info(
+                "Initialized local embeddings model (BAAI/bge-large-en-v1.5)"
+            )
+            return client
+
+        self._client_factories["local_embeddings"] = _make_client
 
     def _validate_braingpt_access(self):
         """
         Validate HF_TOKEN exists and has access to the gated BrainGPT base
         model on Hugging Face. Must be called before _init_braingpt()
         """
+        from huggingface_hub import model_info
+        from huggingface_hub.utils import (
+            GatedRepoError,
+            RepositoryNotFoundError,
+        )
+
         # Get HF token
-        hf_token = os.environ.get("HF_TOKEN")
+        hf_token = load_api_keys()["HF_TOKEN"]
         if not hf_token:
             raise ValueError(
                 "BrainGPT requires HF_TOKEN in .env file. "
@@ -233,12 +793,25 @@ class APIClientManager:
         logger.info("BrainGPT: HF access verified")
 
     def _init_braingpt(self):
+        """
+        Register a factory that loads the BrainGPT model and tokenizer
+        (Llama-2 base + LoRA adapter) as a dict in self.clients["braingpt"]
+        """
+        self._client_factories["braingpt"] = self._load_braingpt
+
+    def _load_braingpt(self) -> Dict[str, Any]:
         """
         Load BrainGPT model and tokenizer (Llama-2 base + LoRA adapter)
-        Stores them in self.clients["braingpt"] as a dict
+
+        Returns:
+            * Dict with "model" and "tokenizer"
         """
+        import torch
+        from peft import PeftModel
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
         # Get HF token, as well as model IDs from config
-        hf_token = os.environ.get("HF_TOKEN")
+        hf_token = load_api_keys()["HF_TOKEN"]
         base_model_id = BRAINGPT_CONFIG["base_model_id"]
         adapter_id = BRAINGPT_CONFIG["adapter_id"]
 
@@ -258,12 +831,11 @@ class APIClientManager:
             base_model_id, token=hf_token
         )
 
-        # Store in clients dict
-        self.clients["braingpt"] = {
+        logger.info("Initialized BrainGPT model")
+        return {
             "model": model,
             "tokenizer": tokenizer,
         }
-        logger.info("Initialized BrainGPT model")
 
     # -------------------------------------------------------------------------
     # Query helpers
@@ -274,6 +846,9 @@ class APIClientManager:
         model_id: str,
         prompt: str,
         temperature: float = None,
+        max_tokens: int = None,
+        response_schema: Dict[str, Any] = None,
+        stop_pattern: re.Pattern = None,
     ) -> str:
         """
         Query any model via OpenRouter
@@ -282,12 +857,24 @@ class APIClientManager:
             * model_id (str): OpenRouter model ID (e.g., 'openai/gpt-4o-mini')
             * prompt (str): Prompt to send to the model
             * temperature (float | None): Override temperature
+            * max_tokens (int | None): Override self.max_tokens
+            * response_schema (dict | None): JSON schema for structured output
+            * stop_pattern (re.Pattern | None): If given, stream the reply and
+                close the stream as soon as the text outside any <think> block
+                matches
 
         Returns:
             * response (str): Model response
         """
-        client = self.clients["openrouter"]
+        client = self._get_client("openrouter")
         temp = temperature if temperature is not None else 0
+        extra = (
+            {"response_format": {
+                "type": "json_schema", "json_schema": response_schema,
+            }}
+            if response_schema
+            else {}
+        )
         response = client.chat.completions.create(
             model=model_id,
             messages=[
@@ -295,15 +882,123 @@ class APIClientManager:
             ],
             temperature=temp,
             seed=42,
-            max_tokens=self.max_tokens,
+            max_tokens=max_tokens or self.max_tokens,
+            stream=stop_pattern is not None,
+            **extra,
         )
-        content = response.choices[0].message.content
+        if stop_pattern is not None:
+            content = self._read_stream(
+                stream=response, stop_pattern=stop_pattern
+            )
+        else:
+            content = response.choices[0].message.content
         if content is None:
             raise Exception(
                 "API returned empty response content"
             )
         return content.strip()
 
+    @staticmethod
+    def _read_stream(stream, stop_pattern: re.Pattern) -> Optional[str]:
+        """
+        Accumulate a streamed completion, closing it early once the answer
+        is complete
+
+        Args:
+            * stream: OpenAI SDK chat completion stream
+            * stop_pattern (re.Pattern): Pattern marking a complete answer
+
+        Returns:
+            * The text received so far, or None if nothing was received
+        """
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                text = "".join(parts)
+
+                # Only match text after a reasoning block has closed
+                if "<think>" in text:
+                    if "</think>" not in text:
+                        continue
+                    text = text.rsplit("</think>", 1)[1]
+                if stop_pattern.search(text):
+                    break
+        finally:
+            stream.close()
+        return "".join(parts) if parts else None
+
+    def _query_openrouter_fused(
+        self,
+        model_id: str,
+        prompts: List[str],
+        temperature: float = None,
+    ) -> List[str]:
+        """
+        Answer several prompts with one OpenRouter request by asking the
+        model for a JSON array of answers. Falls back to one request per
+        prompt if the reply cannot be matched to the prompts
+
+        Args:
+            * model_id (str): OpenRouter model ID (e.g., 'openai/gpt-4o-mini')
+            * prompts (List[str]): Prompts to answer
+            * temperature (float | None): Override temperature
+
+        Returns:
+            * List of answers, one per prompt in the same order
+        """
+        _, provider = self._route(model_id)
+
+        def _query(prompt, max_tokens=None):
+            return self.retry_with_backoff(
+                self._query_openrouter,
+                model_id,
+                prompt,
+                temperature,
+                max_tokens,
+                provider=provider,
+                limit=self._semaphores["openrouter"],
+            )
+
+        if len(prompts) == 1:
+            return [_query(prompts[0])]
+
+        questions = "\n\n".join(
+            f"Question {i}:\n{prompt}"
+            for i, prompt in enumerate(prompts, start=1)
+        )
+        fused_prompt = (
+            f"Answer each of the following {len(prompts)} questions "
+            "independently, exactly as you would if it were asked on its own. "
+            f"Reply with ONLY a JSON array of {len(prompts)} strings, where "
+            "element i is your full answer to question i.\n\n"
+            f"{questions}"
+        )
+        response = _query(
+            fused_prompt, max_tokens=self.max_tokens * len(prompts)
+        )
+
+        # Parse the outermost JSON array in the reply
+        try:
+            answers = json.loads(
+                response[response.index("["):response.rindex("]") + 1]
+            )
+        except ValueError:
+            answers = None
+        if isinstance(answers, list) and len(answers) == len(prompts):
+            return [str(answer).strip() for answer in answers]
+
+        logger.warning_status(
+            f"Could not parse fused reply from {model_id}; "
+            f"querying {len(prompts)} prompts individually"
+        )
+        return [_query(prompt) for prompt in prompts]
+
     def _query_dummy(self, prompt: str) -> str:
         """
         Query dummy model for testing without API usage
@@ -314,47 +1009,17 @@ class APIClientManager:
         Returns:
             * response (str): Dummy response
         """
-        has_justify = "justification" in prompt.lower()
+        found = {m.lastgroup for m in _DUMMY_RE.finditer(prompt)}
         justify_suffix = (
             " | This is a dummy justification for testing."
-            if has_justify
+            if "justify" in found
             else ""
         )
 
-        if (
-            "which of two brain regions" in prompt.lower()
-            or "region 1:" in prompt.lower()
-        ):
-            rank = str(random.choice([1, 2]))
-            return f"{rank}{justify_suffix}"
-        elif "probability" in prompt.lower():
-            prob = f"{random.uniform(0.1, 0.9):.2f}"
-            return f"{prob}{justify_suffix}"
-        elif "top 5 functions" in prompt.lower():
-            functions = [
-                "sensory processing",
-                "motor control",
-                "memory formation",
-                "emotional regulation",
-                "language processing",
-                "attention control",
-                "decision making",
-                "spatial navigation",
-                "auditory processing",
-                "visual processing",
-                "pain perception",
-                "reward processing",
-                "fear response",
-                "learning",
-                "cognition",
-            ]
-            selected = random.sample(functions, 5)
-            result = f"[{', '.join(selected)}]"
-            return f"{result}{justify_suffix}"
-        else:
-            return (
-                "This is a dummy response for testing"
-            )
+        for kind, make_answer in _DUMMY_PRIORITY:
+            if kind in found:
+                return f"{make_answer(self._rng)}{justify_suffix}"
+        return "This is a dummy response for testing"
 
     def _query_braingpt(self, prompt: str) -> str:
         """
@@ -368,8 +1033,11 @@ class APIClientManager:
         """
 
         # Get model and tokenizer from clients dict
-        model = self.clients["braingpt"]["model"]
-        tokenizer = self.clients["braingpt"]["tokenizer"]
+        import torch
+
+        braingpt = self._get_client("braingpt")
+        model = braingpt["model"]
+        tokenizer = braingpt["tokenizer"]
 
         # Tokenize prompt and move to model device
         inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
@@ -397,7 +1065,7 @@ class APIClientManager:
 
     def get_embeddings_batch(
         self, texts: List[str], model: str,
-    ) -> List[List[float]]:
+    ) -> np.ndarray:
         """
         Get embeddings for multiple texts in a single batch call
 
@@ -406,29 +1074,100 @@ class APIClientManager:
             * model: Model name (if "dummy", return random embeddings)
 
         Returns:
-            * List of embedding vectors, one per input text
+            * float32 array of shape (len(texts), dims), one row per input text
         """
 
         # Return random embeddings for dummy model
         if model == "dummy":
             dims = EMBEDDING_DIMS.get(self.embedding_provider, 1024)
-            return [
-                [random.uniform(-1, 1) for _ in range(dims)]
-                for _ in texts
-            ]
+            # Draw float32 in [0, 1) directly and shift in place, avoiding a
+            # float64 temporary the size of the whole batch
+            embeddings = self._rng.random(
+                size=(len(texts), dims), dtype=np.float32
+            )
+            embeddings *= 2.0
+            embeddings -= 1.0
+            return embeddings
+
+        # Serve previously embedded texts from the cache (embeddings are
+        # deterministic, so entries are keyed on provider + text only)
+        keys = [
+            ResponseCache.make_key("emb", self.embedding_provider, text)
+            for text in texts
+        ]
+        embeddings = (
+            [self.cache.get(key) for key in keys]
+            if self.cache is not None
+            else [None] * len(texts)
+        )
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+
+            # Concurrent callers are coalesced into one provider call
+            if self._embedding_batcher is not None:
+                new_embeddings = self._embedding_batcher.submit(
+                    key=self.embedding_provider, item=missing_texts,
+                ).result()
+            else:
+                new_embeddings = self._embed_uncached(texts=missing_texts)
+
+            for i, emb in zip(missing, new_embeddings):
+                embeddings[i] = emb
+                if self.cache is not None:
+                    self.cache.set(keys[i], emb)
+
+        if not embeddings:
+            dims = EMBEDDING_DIMS.get(self.embedding_provider, 1024)
+            return np.empty((0, dims), dtype=np.float32)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with the configured provider, bypassing the cache
 
-        # Get embeddings from the local provider
+        Args:
+            * texts: List of texts to embed
+
+        Returns:
+            * float32 array with one embedding row per input text
+        """
         if self.embedding_provider == "local":
+            # Get embeddings from the local provider
             return self._get_local_embeddings_batch(texts=texts)
 
-        # Get embeddings from OpenAI with retry logic
-        return self.retry_with_backoff(
-            self._get_openai_embeddings_batch, texts,
-        )
+        # Get embeddings from OpenAI with retry logic, one request per chunk
+        # of up to the API's input limit
+        return np.concatenate([
+            self.retry_with_backoff(
+                self._get_openai_embeddings_batch,
+                texts[start:start + _OPENAI_EMBEDDING_BATCH],
+                provider="openai_embeddings",
+            )
+            for start in range(0, len(texts), _OPENAI_EMBEDDING_BATCH)
+        ])
+
+    def _embed_coalesced(
+        self, provider: str, text_lists: List[List[str]],
+    ) -> List[np.ndarray]:
+        """
+        Embed the texts of several concurrent callers in one provider call
+
+        Args:
+            * provider: Embedding provider (batch key, unused)
+            * text_lists: One list of texts per caller
+
+        Returns:
+            * One float32 array per caller, in the same order
+        """
+        flat = [text for texts in text_lists for text in texts]
+        embeddings = self._embed_uncached(texts=flat)
+        offsets = np.cumsum([len(texts) for texts in text_lists])[:-1]
+        return np.split(embeddings, offsets)
 
     def _get_local_embeddings_batch(
         self, texts: List[str],
-    ) -> List[List[float]]:
+    ) -> np.ndarray:
         """
         Batch embed using the local BAAI/bge-large-en-v1.5 model
         SentenceTransformer.encode() natively accepts a list of strings and
@@ -438,16 +1177,16 @@ class APIClientManager:
             * texts: List of strings to embed
 
         Returns:
-            * List of embedding vectors, one per input text
+            * float32 array with one embedding row per input text
         """
-        embeddings = self.clients["local_embeddings"].encode(
+        embeddings = self._get_client("local_embeddings").encode(
             texts, normalize_embeddings=True
         )
-        return embeddings.tolist()
+        return np.asarray(embeddings, dtype=np.float32)
 
     def _get_openai_embeddings_batch(
         self, texts: List[str],
-    ) -> List[List[float]]:
+    ) -> np.ndarray:
         """
         Batch embed using OpenAI's text-embedding-3-large. The API accepts a
         list of strings as input and returns a list of embeddings in the same
@@ -457,10 +1196,11 @@ class APIClientManager:
             * texts: List of strings to embed
 
         Returns:
-            * List of embedding vectors, one per input text
+            * float32 array with one embedding row per input text
         """
-        client = self.clients["openai_embeddings"]
+        client = self._get_client("openai_embeddings")
         response = client.embeddings.create(
             input=texts, model="text-embedding-3-large"
         )
-        return [item.embedding for item in response.data]
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in data], dtype=np.float32)
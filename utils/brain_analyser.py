@@ -1,13 +1,14 @@
 from typing import Dict, Any
 from itertools import product
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 
 from utils.misc.logging_setup import logger
 from utils.core.aggregation import aggregate_results
-from utils.core.visualisation import create_visualisations
 from utils.core.function_task import run_function_task
 from utils.core.probability_task import run_probability_task
 from utils.core.ranking_task import run_ranking_task
+from utils.misc.query_saves import forget_created_dirs
 
 from utils.paths.base import BasePathConstructor
 
@@ -15,8 +16,21 @@ from utils.paths.base import BasePathConstructor
 class BrainAnalyser:
     """Brain Region Analyser"""
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], executor: Executor = None):
+        """
+        Args:
+            * config: Analysis configuration
+            * executor: Shared executor for region/pair tasks. If None, each
+                run creates and tears down its own thread pool
+        """
         self.config = config
+        self.executor = executor
+
+    def _pool(self):
+        """Context manager yielding the executor to submit tasks to"""
+        if self.executor is not None:
+            return nullcontext(self.executor)
+        return ThreadPoolExecutor(max_workers=self.config.workers)
 
     def analyze_functions(self):
         """
@@ -98,34 +112,43 @@ class BrainAnalyser:
 
     def _process_regions(self, analysis_type: str) -> int:
         """
-        Process all regions in parallel
+        Process all regions in parallel. Every (region, hemisphere, model
+        [, function]) task is submitted separately, so a slow model does not
+        hold up the other tasks for the same region
 
         Args:
             * analysis_type: "top-functions" or "query-functions"
         """
         logger.info(f"Running in parallel ({self.config.workers} workers)")
 
-        with ThreadPoolExecutor(max_workers=self.config.workers) as executor:
-            # Submit all region processing tasks
+        with self._pool() as executor:
+            # Submit all leaf tasks, remembering which region each belongs to
             future_to_region = {
-                executor.submit(
-                    self._process_single_region, region, analysis_type
-                ): region
-                for region in self.config.regions
+                executor.submit(task, **kwargs): kwargs["region"]
+                for task, kwargs in self._region_tasks(analysis_type)
             }
+            remaining = {}
+            for region in future_to_region.values():
+                remaining[region] = remaining.get(region, 0) + 1
 
-            # Process results as they complete
+            # A region succeeds once all of its tasks have succeeded
             success_count = 0
+            failed = set()
             for future in as_completed(future_to_region):
                 region = future_to_region[future]
                 try:
                     future.result()
+                except Exception as e:
+                    if region not in failed:
+                        failed.add(region)
+                        logger.error_status(f"Failed {region}: {e}")
+                    continue
+                remaining[region] -= 1
+                if remaining[region] == 0 and region not in failed:
                     success_count += 1
                     logger.processing(
-                        f"Completed {self.config.species} - {region}"
+                        "Completed %s - %s", self.config.species, region,
                     )
-                except Exception as e:
-                    logger.error_status(f"Failed {region}: {e}")
 
         logger.info(
             f"Completed {success_count}/{len(self.config.regions)} regions"
@@ -143,9 +166,7 @@ class BrainAnalyser:
             else [None]
         )
 
-        with ThreadPoolExecutor(
-            max_workers=self.config.workers
-        ) as executor:
+        with self._pool() as executor:
             future_to_task = {}
             for pair, function, hemisphere, model in product(
                 self.config.pairs,
@@ -182,35 +203,39 @@ class BrainAnalyser:
         logger.info(f"Completed {success_count}/{total} tasks")
         return len(self.config.pairs) if success_count == total else 0
 
-    def _process_single_region(
-        self, region: str, analysis_type: str
-    ) -> None:
+    def _region_tasks(self, analysis_type: str):
         """
-        Process one region for all hemispheres and models
+        Yield one leaf task per region, hemisphere, model (and function for
+        probabilities)
 
         Args:
-            * region: Brain region name
             * analysis_type: "top-functions" or "query-functions"
+
+        Yields:
+            * (task_function, kwargs) tuples
         """
         hemispheres = (
             ["left", "right"] if self.config.separate_hemispheres else [None]
         )
 
         if analysis_type == "top-functions":
-            for hemisphere, model in product(
-                hemispheres, self.config.models
+            for region, hemisphere, model in product(
+                self.config.regions, hemispheres, self.config.models
             ):
-                run_function_task(
+                yield run_function_task, dict(
                     config=self.config,
                     region=region,
                     hemisphere=hemisphere,
                     model=model,
                 )
         else:  # probabilities
-            for hemisphere, function, model in product(
-                hemispheres, self.config.functions, self.config.models
+            for region, hemisphere, function, model in product(
+                self.config.regions,
+                hemispheres,
+                self.config.functions,
+                self.config.models,
             ):
-                run_probability_task(
+                yield run_probability_task, dict(
                     config=self.config,
                     region=region,
                     hemisphere=hemisphere,
@@ -229,6 +254,10 @@ class BrainAnalyser:
         aggregate_results(config=self.config, analysis_type=analysis_type)
 
         if not self.config.skip_visualization:
+            # Imported here so runs with --skip-visualization never load
+            # matplotlib/seaborn
+            from utils.core.visualisation import create_visualisations
+
             logger.info("Creating visualizations...")
             create_visualisations(
                 config=self.config, analysis_type=analysis_type
@@ -243,6 +272,7 @@ class BrainAnalyser:
         """Clean up raw data directory"""
         try:
             BasePathConstructor.cleanup_raw_dir()
+            forget_created_dirs()
         except Exception as e:
             logger.error_status(
                 f"Could not clean up raw data: {e}", exc_info=True
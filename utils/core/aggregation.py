@@ -1,14 +1,26 @@
 import os
-import json
+import importlib.util
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
+from utils.misc import fast_json
 from utils.misc.logging_setup import logger
+from utils.misc.query_saves import load_embeddings_csv
 
 from utils.paths.query import QueryPathConstructor
 from utils.paths.embeddings import EmbeddingsPathConstructor
 from utils.paths.aggregation import AggregatedResultsPathConstructor
 
+# pyarrow is optional: when installed, aggregated embeddings are also
+# written as Parquet, which is much smaller and faster to read back
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Probabilities are written with 6 significant digits rather than the full
+# float repr
+_FLOAT_FORMAT = "%.6g"
+
 
 def _iter_model_hemispheres(config, analysis_type, with_embeddings=False):
     """
@@ -43,6 +55,148 @@ def _iter_model_hemispheres(config, analysis_type, with_embeddings=False):
             yield model, hemisphere, query, agg, emb
 
 
+def _map_regions(load_region, regions):
+    """
+    Load per-region files on a thread pool. The work is blocking file I/O
+    and parsing, so threads overlap it; results keep the region order
+
+    Args:
+        * load_region: Callable taking a region name
+        * regions: Region names
+
+    Returns:
+        * List of load_region results, in the order of regions
+    """
+    if not regions:
+        return []
+    with ThreadPoolExecutor(max_workers=min(32, len(regions))) as ex:
+        return list(ex.map(load_region, regions))
+
+
+def _stack_frames(dfs) -> pd.DataFrame:
+    """
+    Stack DataFrames vertically. Frames with identical columns (embeddings
+    from one model) are stacked as one NumPy block, which skips pandas'
+    per-block alignment and copy
+
+    Args:
+        * dfs: Non-empty list of DataFrames
+
+    Returns:
+        * The stacked DataFrame
+    """
+    columns = dfs[0].columns
+    if all(df.columns.equals(columns) for df in dfs):
+        index = np.concatenate([df.index.to_numpy() for df in dfs])
+        return pd.DataFrame(
+            np.vstack([df.to_numpy() for df in dfs]),
+            index=pd.Index(index, name=dfs[0].index.name),
+            columns=columns,
+        )
+    return pd.concat(dfs, sort=False)
+
+
+def _existing_files(paths: Iterable[str]) -> Set[str]:
+    """
+    Find which of the given files exist with one directory scan per
+    distinct parent, instead of a stat call per file
+
+    Args:
+        * paths: File paths (as built by the path constructors)
+
+    Returns:
+        * The subset of paths that exist
+    """
+    paths = set(paths)
+    present = set()
+    for directory in {os.path.dirname(path) for path in paths}:
+        try:
+            with os.scandir(directory) as entries:
+                present.update(f"{directory}/{e.name}" for e in entries)
+        except OSError:
+            continue
+    return paths & present
+
+
+def _require_file(path: str, description: str, present: Set[str]) -> None:
+    """
+    Raise if an expected per-region file is missing
+
+    Args:
+        * path: File path
+        * description: What the file holds, for the error message
+        * present: Existing files, from _existing_files()
+    """
+    if path not in present:
+        logger.error_status(f"No {description} file found: {path}")
+        raise FileNotFoundError(path)
+
+
+def _function_region_paths(region: str, query, emb) -> Tuple[str, str, str]:
+    """
+    Build one region's response, embedding and per-function embedding paths
+
+    Args:
+        * region: Region name
+        * query: QueryPathConstructor for this model/hemisphere
+        * emb: EmbeddingsPathConstructor for this model/hemisphere
+
+    Returns:
+        * (response path, embedding path, per-function embedding path)
+    """
+    return (
+        query.construct_query_cleaned_region_path(
+            region=region, trial="final",
+        ),
+        emb.construct_embeddings_region_path(
+            region=region, trial="final",
+        ),
+        emb.construct_per_function_embeddings_region_path(
+            region=region, trial="final",
+        ),
+    )
+
+
+def _load_function_region(
+    region: str, model: str, query, emb, present: Set[str],
+) -> Tuple[str, Optional[Any], pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Load one region's cleaned response and embeddings
+
+    Args:
+        * region: Region name
+        * model: Model whose response is extracted
+        * query: QueryPathConstructor for this model/hemisphere
+        * emb: EmbeddingsPathConstructor for this model/hemisphere
+        * present: Existing files, from _existing_files()
+
+    Returns:
+        * (region, response or None, combined embedding DataFrame,
+            per-function embedding DataFrame or None)
+    """
+    res_path, emb_path, pf_path = _function_region_paths(
+        region=region, query=query, emb=emb,
+    )
+
+    # Load function response
+    _require_file(res_path, "query results", present)
+    with open(res_path, "rb") as f:
+        response = fast_json.loads(f.read()).get(model)
+
+    # Load combined embedding
+    _require_file(emb_path, "embeddings", present)
+    df = load_embeddings_csv(emb_path)
+
+    # Load per-function embeddings if available
+    pf_df = None
+    if pf_path in present:
+        pf_df = load_embeddings_csv(pf_path)
+        # Add region column for multi-index
+        pf_df.insert(0, "region", region)
+
+    return region, response, df, pf_df
+
+
 def aggregate_function_results(
     config: Dict[str, Any], analysis_type: str = "top-functions"
 ):
@@ -65,67 +219,53 @@ def aggregate_function_results(
         embedding_dfs = []
         per_func_embedding_dfs = []
 
-        for region in config.regions:
-
-            # Get the function response path
-            res_path = query.construct_query_cleaned_region_path(
-                region=region, trial="final",
-            )
-            if not os.path.exists(res_path):
-                logger.error_status(
-                    f"No query results file found: {res_path}",
-                    exc_info=True,
-                )
-                raise
-
-            # Load function response
-            with open(res_path) as f:
-                data = json.load(f)
-                if model in data:
-                    all_responses[region] = data[model]
-
-            # Get the combined embedding path
-            emb_path = emb.construct_embeddings_region_path(
-                region=region, trial="final",
+        # Check every region's files with one scan per directory
+        present = _existing_files(
+            path
+            for region in config.regions
+            for path in _function_region_paths(
+                region=region, query=query, emb=emb,
             )
-            if not os.path.exists(emb_path):
-                logger.error_status(
-                    f"No embeddings file found: {emb_path}",
-                    exc_info=True,
-                )
-                raise
-
-            # Load combined embedding
-            df = pd.read_csv(emb_path, index_col=0)
+        )
+        loaded = _map_regions(
+            lambda region: _load_function_region(
+                region=region, model=model, query=query, emb=emb,
+                present=present,
+            ),
+            config.regions,
+        )
+        # Combine in the main thread so output order is deterministic
+        for region, response, df, pf_df in loaded:
+            if response is not None:
+                all_responses[region] = response
             embedding_dfs.append(df)
-
-            # Load per-function embeddings if available
-            pf_path = emb.construct_per_function_embeddings_region_path(
-                region=region, trial="final",
-            )
-            if os.path.exists(pf_path):
-                pf_df = pd.read_csv(pf_path, index_col=0)
-                # Add region column for multi-index
-                pf_df.insert(0, "region", region)
+            if pf_df is not None:
                 per_func_embedding_dfs.append(pf_df)
 
         # Get aggregated paths
         agg_path = agg.construct_aggregated_query_results_path()
         aggemb_path = agg.construct_aggregated_embeddings_path()
-        os.makedirs(os.path.dirname(agg_path), exist_ok=True)
-        os.makedirs(os.path.dirname(aggemb_path), exist_ok=True)
+        # Every aggregated output for this model/hemisphere shares one dir
+        os.makedirs(agg.aggregated_query_results_dir, exist_ok=True)
 
         # Save query responses
-        with open(agg_path, "w") as f:
-            json.dump(all_responses, f, indent=2)
+        with open(agg_path, "w", encoding="utf-8") as f:
+            f.write(fast_json.dumps(all_responses, indent=True))
         logger.processing(
             f"Saved {len(all_responses)} function responses for "
             f"{model}/{hemisphere if hemisphere else 'no_separation'}"
         )
 
         # Save combined embeddings as CSV
-        all_embeddings_df = pd.concat(embedding_dfs)
-        all_embeddings_df.to_csv(aggemb_path)
+        all_embeddings_df = _stack_frames(embedding_dfs)
+        all_embeddings_df.to_csv(aggemb_path, chunksize=10_000)
+        if _HAS_PYARROW:
+            all_embeddings_df.to_parquet(
+                agg.construct_aggregated_embeddings_path(extension="parquet"),
+                engine="pyarrow",
+                compression="zstd",
+                index=True,
+            )
         logger.processing(
             f"Saved {len(embedding_dfs)} embeddings for "
             f"{model}/{hemisphere if hemisphere else 'no_separation'}"
@@ -136,7 +276,6 @@ def aggregate_function_results(
             aggpf_path = (
                 agg.construct_aggregated_per_function_embeddings_path()
             )
-            os.makedirs(os.path.dirname(aggpf_path), exist_ok=True)
             all_pf_df = pd.concat(per_func_embedding_dfs)
             all_pf_df.to_csv(aggpf_path)
             logger.processing(
@@ -145,6 +284,31 @@ def aggregate_function_results(
             )
 
 
+def _load_probability_region(
+    region: str, query, present: Set[str],
+) -> Tuple[str, Any]:
+    """
+    Load one region's probability response
+
+    Args:
+        * region: Region name
+        * query: QueryPathConstructor for this model/hemisphere
+        * present: Existing files, from _existing_files()
+
+    Returns:
+        * (region, parsed response)
+    """
+    # Get the function response path
+    res_path = query.construct_query_region_path(
+        region=region, trial="final",
+    )
+    _require_file(res_path, "query results", present)
+
+    # Load function response
+    with open(res_path, "rb") as f:
+        return region, fast_json.loads(f.read())
+
+
 def aggregate_probability_results(
     config: Dict[str, Any], analysis_type: str = "query-functions"
 ):
@@ -163,72 +327,73 @@ def aggregate_probability_results(
         config, analysis_type,
     ):
         # Collect probability data
-        all_data = {}
-
-        for region in config.regions:
-
-            # Get the function response path
-            res_path = query.construct_query_region_path(
-                region=region, trial="final",
+        present = _existing_files(
+            query.construct_query_region_path(region=region, trial="final")
+            for region in config.regions
+        )
+        all_data = dict(_map_regions(
+            lambda region: _load_probability_region(
+                region=region, query=query, present=present,
+            ),
+            config.regions,
+        ))
+
+        # Create overview DataFrame from a region x function matrix, NaN
+        # where a probability is missing
+        matrix = np.full(
+            (len(config.regions), len(config.functions)), np.nan,
+        )
+        for i, region in enumerate(config.regions):
+            region_data = all_data.get(region, {})
+            for j, function in enumerate(config.functions):
+                prob_value = region_data.get(function, {}).get(model)
+                if prob_value is not None:
+                    matrix[i, j] = prob_value
+
+        df = pd.DataFrame(
+            matrix,
+            index=pd.Index(config.regions, name="Region"),
+            columns=config.functions,
+        )
+        has_value = ~np.isnan(matrix)
+        if not has_value.any():
+            logger.warning_status(
+                f"No probabilities to aggregate for {model}/"
+                f"{hemisphere if hemisphere else 'no_separation'}"
             )
-            if not os.path.exists(res_path):
-                logger.error_status(
-                    f"No query results file found: {res_path}",
-                    exc_info=True,
-                )
-                raise
-
-            # Load function response
-            with open(res_path) as f:
-                region_data = json.load(f)
-                all_data[region] = region_data
-
-        # Create overview DataFrame
-        df_data = []
-        for region in config.regions:
-            if region in all_data:
-                row = {"Region": region}
-                for function in config.functions:
-                    # Cleaner probability extraction
-                    prob_value = (
-                        all_data[region].get(function, {}).get(model)
-                    )
-                    row[function] = prob_value
-                df_data.append(row)
-
-        df = pd.DataFrame(df_data).set_index("Region")
+            continue
 
         # Get aggregated paths
         agg_path = agg.construct_aggregated_query_results_path(
             extension="csv",
         )
         os.makedirs(os.path.dirname(agg_path), exist_ok=True)
-        df.to_csv(agg_path)
+        df.to_csv(agg_path, float_format=_FLOAT_FORMAT)
         logger.processing(
             f"Saved probability overview for {model}/"
             f"{hemisphere if hemisphere else 'no_separation'}"
         )
 
-        # Save individual function files
-        for function in config.functions:
+        # Save individual function files, one matrix column each with
+        # missing values dropped
+        regions = df.index.to_numpy()
+        for j, function in enumerate(config.functions):
+            mask = has_value[:, j]
+            if not mask.any():
+                continue
+
             path = agg.construct_individual_function_prob_path(
                 function=function,
             )
             os.makedirs(os.path.dirname(path), exist_ok=True)
-
-            # Extract function probabilities and drop NaNs
-            func_df = (
-                df[[function]]
-                .dropna()
-                .rename(columns={function: "Probability"})
+            func_df = pd.DataFrame(
+                {"Probability": matrix[mask, j]},
+                index=pd.Index(regions[mask], name=df.index.name),
+            )
+            func_df.to_csv(path, float_format=_FLOAT_FORMAT)
+            logger.processing(
+                "Saved %d probabilities for %s", len(func_df), function,
             )
-
-            # Save if not empty
-            if not func_df.empty:
-                func_df.to_csv(path)
-                logger.processing(
-                    f"Saved {len(func_df)} probabilities for {function}"
-                )
 
 
 def aggregate_ranking_results(
@@ -250,18 +415,20 @@ def aggregate_ranking_results(
         config, analysis_type,
     ):
         for r1, r2 in config.pairs:
-            rows = []
-            for function in config.functions:
-                path = query.construct_query_pair_path(
-                    region_1=r1, region_2=r2,
-                    trial="final",
-                )
-                if not os.path.exists(path):
-                    continue
+            # One results file per pair holds every function, so it is
+            # located and parsed once rather than per function
+            path = query.construct_query_pair_path(
+                region_1=r1, region_2=r2,
+                trial="final",
+            )
+            if not os.path.exists(path):
+                continue
 
-                with open(path) as f:
-                    data = json.load(f)
+            with open(path, "rb") as f:
+                data = fast_json.loads(f.read())
 
+            rows = []
+            for function in config.functions:
                 ranking = (
                     data.get(function, {}).get(model)
                 )
@@ -320,8 +487,8 @@ def aggregate_justifications(
                     )
                 )
                 if os.path.exists(just_path):
-                    with open(just_path) as f:
-                        data = json.load(f)
+                    with open(just_path, "rb") as f:
+                        data = fast_json.loads(f.read())
                     pair_key = f"{r1}_vs_{r2}"
                     all_justifications[pair_key] = data
         else:
@@ -334,8 +501,8 @@ def aggregate_justifications(
                     )
                 )
                 if os.path.exists(just_path):
-                    with open(just_path) as f:
-                        data = json.load(f)
+                    with open(just_path, "rb") as f:
+                        data = fast_json.loads(f.read())
                     all_justifications[region] = data
 
         if all_justifications:
@@ -345,10 +512,8 @@ def aggregate_justifications(
             os.makedirs(
                 os.path.dirname(agg_path), exist_ok=True
             )
-            with open(agg_path, "w") as f:
-                json.dump(
-                    all_justifications, f, indent=2
-                )
+            with open(agg_path, "w", encoding="utf-8") as f:
+                f.write(fast_json.dumps(all_justifications, indent=True))
             logger.processing(
                 f"Saved justification aggregation for "
                 f"{model}/{hemisphere or 'no_separation'}"
@@ -377,10 +542,10 @@ def aggregate_retest_statistics(
                     region=region,
                 )
                 if os.path.exists(path):
-                    with open(path) as f:
-                        data = json.load(f)
-                    if model in data:
-                        scores[region] = data[model].get(
+                    with open(path, "rb") as f:
+                        summary = fast_json.loads(f.read()).get(model)
+                    if summary is not None:
+                        scores[region] = summary.get(
                             "consistency_score", None
                         )
 
@@ -407,12 +572,12 @@ def aggregate_retest_statistics(
                 )
                 if not os.path.exists(path):
                     continue
-                with open(path) as f:
-                    data = json.load(f)
-                if model not in data:
+                with open(path, "rb") as f:
+                    summary = fast_json.loads(f.read()).get(model)
+                if summary is None:
                     continue
                 row = {"Region": region}
-                funcs = data[model].get("functions", {})
+                funcs = summary.get("functions", {})
                 for func_name, stats in funcs.items():
                     row[f"{func_name}_mean"] = (
                         stats.get("mean")
@@ -448,12 +613,12 @@ def aggregate_retest_statistics(
                 )
                 if not os.path.exists(path):
                     continue
-                with open(path) as f:
-                    data = json.load(f)
-                if model not in data:
+                with open(path, "rb") as f:
+                    summary = fast_json.loads(f.read()).get(model)
+                if summary is None:
                     continue
                 row = {"Pair": pair_name}
-                funcs = data[model].get(
+                funcs = summary.get(
                     "functions", {}
                 )
                 for func_name, stats in funcs.items():
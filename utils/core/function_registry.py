@@ -1,6 +1,9 @@
+import os
 import json
+import functools
 from typing import List, Dict, Tuple, Optional
 
+from utils.misc import fast_json
 from utils.misc.logging_setup import logger
 from utils.misc.variables import DEFAULT_FUNCTIONS
 
@@ -38,23 +41,16 @@ def save_functions(
 
 def load_functions() -> Tuple[List[str], Dict[str, List[str]]]:
     """
-    Load functions and function groups from functions.json
+    Load functions and function groups from functions.json. The parsed file
+    is cached per modification time, so it is only read again after it
+    changes
 
     Returns:
         * Tuple containing (list of functions, dictionary of function groups)
     """
     try:
-        with open("functions.json", "r") as f:
-            data = json.load(f)
-
-        functions = data.get("functions", [])
-        groups = data.get("groups", {})
-
-        logger.processing(
-            f"Loaded {len(functions)} functions and {len(groups)} "
-            "groups from functions.json"
-        )
-        return functions, groups
+        mtime = os.stat("functions.json").st_mtime_ns
+        functions, groups = _load_functions(mtime=mtime)
     except Exception as e:
         logger.warning_status(
             f"Error loading functions.json: {str(e)}. Using default functions"
@@ -63,6 +59,35 @@ def load_functions() -> Tuple[List[str], Dict[str, List[str]]]:
         save_functions(DEFAULT_FUNCTIONS, default_groups)
         return DEFAULT_FUNCTIONS, default_groups
 
+    # Copies, so callers can't modify the cached result
+    return list(functions), {
+        name: list(members) for name, members in groups.items()
+    }
+
+
+@functools.lru_cache(maxsize=4)
+def _load_functions(mtime: int) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Parse functions.json once for a given modification time
+
+    Args:
+        * mtime (int): File modification time (cache key only)
+
+    Returns:
+        * Tuple containing (list of functions, dictionary of function groups)
+    """
+    with open("functions.json", "rb") as f:
+        data = fast_json.loads(f.read())
+
+    functions = data.get("functions", [])
+    groups = data.get("groups", {})
+
+    logger.processing(
+        f"Loaded {len(functions)} functions and {len(groups)} "
+        "groups from functions.json"
+    )
+    return functions, groups
+
 
 def load_function_group(group_name: str) -> List[str]:
     """
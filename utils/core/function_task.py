@@ -1,6 +1,5 @@
 import os
 import json
-import numpy as np
 import pandas as pd
 
 from types import SimpleNamespace
@@ -37,6 +36,9 @@ def run_function_task(
     """
     analysis_type = "top-functions"
 
+    # Bound once per task rather than resolved on every response
+    get_embeddings_batch = config.client_manager.get_embeddings_batch
+
     query = QueryPathConstructor(
         model=model, species=config.species,
         atlas_name=config.atlas_name,
@@ -106,7 +108,7 @@ def run_function_task(
             return False
 
         # All trials and final result are done, we can skip
-        logger.info(f"Skipping {region} ({model}) - already done")
+        logger.info("Skipping %s (%s) - already done", region, model)
         return True
 
     def load_trial(
@@ -128,7 +130,7 @@ def run_function_task(
                 region=region, trial=trial,
             )
         )
-        with open(clean_path) as f:
+        with open(clean_path, encoding="utf-8") as f:
             data = json.load(f)
         cleaned = data[model]
 
@@ -160,7 +162,7 @@ def run_function_task(
                 )
             )
             if os.path.exists(just_path):
-                with open(just_path) as f:
+                with open(just_path, encoding="utf-8") as f:
                     jdata = json.load(f)
                 justification = jdata.get(model)
 
@@ -189,15 +191,12 @@ def run_function_task(
         """
         cleaned = clean_functions_response(response=answer)
         # Per-function embeddings via single batch call
-        per_function_embeddings = (
-            config.client_manager.get_embeddings_batch(
-                texts=cleaned, model=model
-            )
+        per_function_embeddings = get_embeddings_batch(
+            texts=cleaned, model=model
         )
-        # Combined embedding = mean of per-function vectors
-        combined_embedding = np.mean(
-            per_function_embeddings, axis=0
-        ).tolist()
+        # Combined embedding = mean of per-function vectors (kept as a float32
+        # array; saving and averaging accept arrays as well as lists)
+        combined_embedding = per_function_embeddings.mean(axis=0)
         return {
             "cleaned": cleaned,
             "embedding": combined_embedding,
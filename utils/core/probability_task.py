@@ -95,7 +95,9 @@ def run_probability_task(
             return False
 
         # All trials and final result are done, we can skip
-        logger.info(f"Skipping {region}/{function} ({model}) - already done")
+        logger.info(
+            "Skipping %s/%s (%s) - already done", region, function, model,
+        )
         return True
 
     def load_trial(
@@ -113,7 +115,7 @@ def run_probability_task(
         """
         # Load probability result from JSON file
         path = query.construct_query_region_path(region=region, trial=trial)
-        with open(path) as f:
+        with open(path, encoding="utf-8") as f:
             data = json.load(f)
         prob = data[function][model]
 
@@ -127,7 +129,7 @@ def run_probability_task(
                 )
             )
             if os.path.exists(just_path):
-                with open(just_path) as f:
+                with open(just_path, encoding="utf-8") as f:
                     jdata = json.load(f)
                 justification = (
                     jdata.get(function, {}).get(model)
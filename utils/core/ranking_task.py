@@ -103,8 +103,8 @@ def run_ranking_task(
 
         # All trials and final result are complete, can skip
         logger.info(
-            f"Skipping {region_1} vs {region_2}/{function} ({model}) - "
-            "already done"
+            "Skipping %s vs %s/%s (%s) - already done",
+            region_1, region_2, function, model,
         )
         return True
 
@@ -127,7 +127,7 @@ def run_ranking_task(
             region_2=region_2,
             trial=trial,
         )
-        with open(path) as f:
+        with open(path, encoding="utf-8") as f:
             data = json.load(f)
         ranking = data[function][model]
 
@@ -143,7 +143,7 @@ def run_ranking_task(
                 )
             )
             if os.path.exists(just_path):
-                with open(just_path) as f:
+                with open(just_path, encoding="utf-8") as f:
                     jdata = json.load(f)
                 justification = (
                     jdata.get(function, {}).get(model)
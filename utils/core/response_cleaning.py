@@ -1,5 +1,42 @@
 import re
-from typing import List, Tuple
+import json
+from itertools import islice
+from typing import Any, List, Optional, Tuple
+
+# Streaming early-stop patterns (--stream-early-stop): once a streamed reply
+# matches, the answer is complete and the rest of the generation is dropped.
+# Numbers require a trailing non-digit so a partial number is never accepted,
+# and function lists require the closing bracket. Probabilities only stop on
+# a complete number in [-1, 1], since clean_probability_response skips
+# out-of-range values and may find a valid one later in the reply
+EARLY_STOP_PATTERNS = {
+    "top-functions": re.compile(r"\[[^\]]*,[^\]]*\]"),
+    "query-functions": re.compile(
+        r"(?<![\d.])-?(?:0?\.\d+|1(?:\.0*)?|0)(?=[^\d.])"
+    ),
+    "rankings": re.compile(r"\b[12]\b(?=[^\d.])"),
+}
+
+# Cleaning patterns, compiled once at import
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+_INTRO_RE = re.compile(
+    r"^\s*.*?(is involved in|is primarily involved in|"
+    r"here are the top 5 main functions associated with these regions|"
+    r"functions of).*?:\s*",
+    re.IGNORECASE | re.DOTALL,
+)
+_BRACKET_RE = re.compile(r"\[(.*?)(?:\]|$)")
+_NUMBERING_RE = re.compile(r"(?:\d+\.\s*|Function\s*\d+:\s*)")
+_NUMBER_RE = re.compile(r"-?\d*\.?\d+")
+_RANKING_RE = re.compile(r"\b([12])\b")
+
+# Placeholder entries dropped from function lists
+_PLACEHOLDER_FUNCTIONS = frozenset({"unknown", "unclear", "n/a"})
+
+# Unicode hyphens/dashes mapped to an ASCII hyphen
+_DASH_TABLE = str.maketrans(
+    dict.fromkeys("\u2010\u2011\u2012\u2013\u2014\u2015", "-")
+)
 
 
 def _preprocess_response(response: str) -> str:
@@ -13,13 +50,30 @@ def _preprocess_response(response: str) -> str:
     Returns:
         * Cleaned response string without <think> tags
     """
-    response = re.sub(
-        r"<think>.*?</think>", "", response, flags=re.DOTALL
-    ).strip()
-    response = re.sub(
-        r"[\u2010\u2011\u2012\u2013\u2014\u2015]", "-", response
-    )
-    return response
+    if "<think>" in response:
+        response = _THINK_RE.sub("", response)
+    return response.strip().translate(_DASH_TABLE)
+
+
+def _json_field(response: str, field: str) -> Optional[Any]:
+    """
+    Read a field from a structured (--json-mode) response
+
+    Args:
+        * response: Preprocessed response string from the model
+        * field: Key to read from the JSON object
+
+    Returns:
+        * The field value, or None if the response is not a JSON object
+            containing it
+    """
+    if not response.startswith("{"):
+        return None
+    try:
+        data = json.loads(response)
+    except ValueError:
+        return None
+    return data.get(field) if isinstance(data, dict) else None
 
 
 def clean_functions_response(response: str) -> List[str]:
@@ -34,39 +88,37 @@ def clean_functions_response(response: str) -> List[str]:
     """
     response = _preprocess_response(response=response)
 
+    # Structured output: take the list directly
+    functions = _json_field(response=response, field="functions")
+    if isinstance(functions, list) and len(functions) >= 5:
+        return [str(f).strip() for f in functions[:5]]
+
     # Remove introductory text like "Region X is involved in:"
-    response = re.sub(
-        pattern=(
-            r"^\s*.*?(is involved in|is primarily involved in|"
-            r"here are the top 5 main functions associated with these regions|"
-            r"functions of).*?:\s*"
-        ),
-        repl="",
-        string=response,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    response = _INTRO_RE.sub("", response)
 
     # Extract from brackets if present (handle missing closing bracket)
-    bracket_match = re.search(r"\[(.*?)(?:\]|$)", response)
+    bracket_match = _BRACKET_RE.search(response)
     if bracket_match:
         response = bracket_match.group(1)
 
     # Remove numbering and function labels
-    response = re.sub(r"(?:\d+\.\s*|Function\s*\d+:\s*)", "", response)
-
-    # Split by commas and clean
-    functions = [
-        f.strip().strip("\"'[]")
-        for f in response.split(",")
-        if f.strip()
-        and f.strip().lower() not in {"unknown", "unclear", "n/a", ""}
-    ]
+    response = _NUMBERING_RE.sub("", response)
+
+    # Split by commas and clean, stopping once 5 functions are found
+    functions = list(islice(
+        (
+            f.strip("\"'[]")
+            for f in map(str.strip, response.split(","))
+            if f and f.lower() not in _PLACEHOLDER_FUNCTIONS
+        ),
+        5,
+    ))
 
-    # Assert we have at least 5 functions
-    assert len(functions) >= 5, "Less than 5 functions found"
+    # Check we have at least 5 functions
+    if len(functions) < 5:
+        raise ValueError("Less than 5 functions found")
 
-    # Return up to 5 functions
-    return functions[:5]
+    return functions
 
 
 def clean_probability_response(response: str) -> float:
@@ -82,12 +134,24 @@ def clean_probability_response(response: str) -> float:
     """
     response = _preprocess_response(response=response)
 
-    # Find all numbers (including negative decimals)
-    numbers = re.findall(r"-?\d*\.?\d+", response)
+    # Structured output: take the number directly
+    value = _json_field(response=response, field="probability")
+    if isinstance(value, (int, float)) and -1.0 <= value <= 1.0:
+        return float(value)
 
-    for num_str in numbers:
+    # Common case: the reply is just the number
+    if response.lstrip("-").replace(".", "", 1).isdigit():
         try:
-            value = float(num_str)
+            value = float(response)
+            if -1.0 <= value <= 1.0:
+                return value
+        except ValueError:
+            pass
+
+    # Scan numbers (including negative decimals), stopping at the first
+    for match in _NUMBER_RE.finditer(response):
+        try:
+            value = float(match.group())
             # Return first value in valid probability range
             if -1.0 <= value <= 1.0:
                 return value
@@ -129,8 +193,13 @@ def clean_ranking_response(response: str) -> int:
     """
     response = _preprocess_response(response=response)
 
+    # Structured output: take the ranking directly
+    value = _json_field(response=response, field="more_relevant")
+    if value in (1, 2):
+        return int(value)
+
     # Find the first 1 or 2
-    match = re.search(r"\b([12])\b", response)
+    match = _RANKING_RE.search(response)
     if match:
         return int(match.group(1))
 
@@ -6,7 +6,11 @@ from typing import Any, Callable, Dict, List, Tuple, Union
 
 from utils.misc.logging_setup import logger
 from utils.prompts import generate_prompt
-from utils.core.response_cleaning import split_justified_response
+from utils.misc.variables import RESPONSE_SCHEMAS
+from utils.core.response_cleaning import (
+    EARLY_STOP_PATTERNS,
+    split_justified_response,
+)
 
 
 def json_file_has_key(path: str, key: str) -> bool:
@@ -23,7 +27,7 @@ def json_file_has_key(path: str, key: str) -> bool:
     if not os.path.exists(path):
         return False
     try:
-        with open(path, "r") as f:
+        with open(path, encoding="utf-8") as f:
             data = json.load(f)
         return key in data
     except (json.JSONDecodeError, OSError):
@@ -84,72 +88,98 @@ def process_task(
     if skip_check():
         return
 
-    prompt = None
-    trial_results = []
-    trial_justifications = []
+    def trial_suffix(trial: int) -> str:
+        return f" trial {trial}" if config.retest > 1 else ""
 
-    # Loop over trials, skipping existing ones and loading results if present
+    # Load existing trials and collect the ones that still need querying
+    results = {}
+    justifications = {}
+    missing = []
     for trial in range(config.retest):
 
         # Skip existing trials
         if trial_complete(trial):
-            logger.info(
-                f"Loading existing {log_label}"
-                + (
-                    f" trial {trial}"
-                    if config.retest > 1
-                    else ""
-                )
-            )
+            logger.info("Loading existing %s%s", log_label, trial_suffix(trial))
             # Load result and justification (if applicable) for this trial
-            result, justification = load_trial(trial)
-            trial_results.append(result)
-            if justification:
-                trial_justifications.append(
-                    justification
-                )
-            continue
-
-        # Generate prompt lazily
-        if prompt is None:
-            prompt = generate_prompt(
-                species=config.species,
-                atlas_name=config.atlas_name,
-                template_name=config.prompt_template_name,
-                justify=config.justify,
-                save_to_results=True,
-                **prompt_kwargs,
-            )
+            results[trial], justifications[trial] = load_trial(trial)
+        else:
+            missing.append(trial)
+
+    if missing:
+        # Generate prompt once, shared by all missing trials
+        prompt = generate_prompt(
+            species=config.species,
+            atlas_name=config.atlas_name,
+            template_name=config.prompt_template_name,
+            justify=config.justify,
+            save_to_results=True,
+            **prompt_kwargs,
+        )
 
-        logger.processing(
-            f"Querying {log_label}"
-            + (
-                f" trial {trial}"
-                if config.retest > 1
-                else ""
-            )
+        for trial in missing:
+            logger.processing("Querying %s%s", log_label, trial_suffix(trial))
+
+        # Request structured output when --json-mode is on
+        response_schema = (
+            RESPONSE_SCHEMAS[prompt_kwargs["prompt_type"]]
+            if config.json_mode
+            else None
         )
 
-        # Query model and split justification if needed
-        response = config.client_manager.query_model(
-            model_name=model, prompt=prompt,
-            temperature=config.temperature,
+        # Stop streaming short answers early when --stream-early-stop is on
+        # (not with justifications or JSON, which continue past the answer)
+        stop_pattern = (
+            EARLY_STOP_PATTERNS.get(prompt_kwargs["prompt_type"])
+            if config.stream_early_stop
+            and not config.justify
+            and not config.json_mode
+            else None
         )
-        answer, justification = (
-            split_if_justified(config=config, response=response)
+
+        # Query all missing trials concurrently
+        responses = config.client_manager.query_many(
+            jobs=[
+                dict(
+                    model_name=model, prompt=prompt,
+                    temperature=config.temperature,
+                    trial=trial,
+                    response_schema=response_schema,
+                    stop_pattern=stop_pattern,
+                )
+                for trial in missing
+            ],
+            return_exceptions=True,
         )
 
-        # Process response and append justification if applicable
-        result = process_response(answer, response)
-        trial_results.append(result)
-        if justification:
-            trial_justifications.append(justification)
+        # Process and save successful trials before surfacing any failure
+        errors = []
+        for trial, response in zip(missing, responses):
+            if isinstance(response, Exception):
+                errors.append(response)
+                continue
 
-        # Save trial result
-        save_result(
-            result, trial=trial,
-            justification=justification,
-        )
+            # Split justification if needed, then process the response
+            answer, justification = (
+                split_if_justified(config=config, response=response)
+            )
+            result = process_response(answer, response)
+            results[trial] = result
+            justifications[trial] = justification
+
+            # Save trial result
+            save_result(
+                result, trial=trial,
+                justification=justification,
+            )
+        if errors:
+            raise errors[0]
+
+    trial_results = [results[trial] for trial in range(config.retest)]
+    trial_justifications = [
+        justifications[trial]
+        for trial in range(config.retest)
+        if justifications[trial]
+    ]
 
     # After all trials, recompute final results from all trial results to
     # ensure consistency (e.g., averaging probabilities, etc)
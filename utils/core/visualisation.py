@@ -1,16 +1,161 @@
 import os
+import multiprocessing
+import numpy as np
 import pandas as pd
 import seaborn as sns
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
 import matplotlib.pyplot as plt
 
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
 from utils.misc.logging_setup import logger
+from utils.misc.query_saves import load_embeddings_csv
 
 from utils.paths.aggregation import AggregatedResultsPathConstructor
 from utils.paths.visualisation import VisualizationPathConstructor
 
+# Per-cell annotations cost one text object each, so large heatmaps are drawn
+# without them (and rasterised at a lower dpi)
+_ANNOT_MAX_REGIONS = 40
+_ANNOT_MAX_CELLS = 1500
+_LARGE_HEATMAP_DPI = 150
+
+# Below this many bar plots, starting worker processes (each re-importing
+# matplotlib and seaborn) costs more than rendering in-process
+_PARALLEL_MIN_PLOTS = 16
+
+# zlib level 3 roughly halves PNG encode time against the default for a
+# slightly larger file
+_PNG_KWARGS = {"compress_level": 3}
+
+
+def _annotations(values: np.ndarray, enabled: bool):
+    """
+    Format heatmap cell labels in one vectorised pass, so seaborn doesn't
+    call format() per cell
+
+    Args:
+        * values: Heatmap values
+        * enabled: Whether the heatmap is annotated at all
+
+    Returns:
+        * Array of "%.2f" strings to pass as annot (with fmt=""), or False
+    """
+    if not enabled:
+        return False
+    return np.char.mod("%.2f", values.astype(np.float32))
+
+
+def _mtime(path: str):
+    """Return a file's modification time, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _init_plot_worker():
+    """Select the non-interactive backend in plotting worker processes"""
+    matplotlib.use("Agg")
+
+
+def _plot_function_chunk(
+    jobs: List[Tuple[str, List[str], List[float], bool, str]],
+):
+    """
+    Draw and save probability bar plots, reusing one figure for the whole
+    chunk instead of creating and tearing one down per plot
+
+    Args:
+        * jobs: (title, region labels, probabilities sorted ascending,
+            whether any probability is negative, output path) per plot
+    """
+    fig, ax = plt.subplots()
+    try:
+        for title, labels, values, has_negative, path in jobs:
+            ax.clear()
+            fig.set_size_inches(10, len(values) * 0.3 + 2)
+
+            # Color bars based on positive/negative values
+            if has_negative:
+                colors = ["red" if val < 0 else "blue" for val in values]
+                ax.barh(labels, values, color=colors)
+                ax.axvline(x=0, color="black", linestyle="-", alpha=0.3)
+                ax.set_xlim(-1, 1)
+            else:
+                ax.barh(labels, values, color="blue")
+                ax.set_xlim(0, 1)
+
+            ax.set_title(title)
+            ax.set_xlabel("Probability")
+            fig.tight_layout()
+
+            # Save function plot (200 dpi is plenty for a bar chart)
+            fig.savefig(
+                path,
+                dpi=200,
+                bbox_inches="tight",
+                pil_kwargs=_PNG_KWARGS,
+            )
+    finally:
+        plt.close(fig)
+
+
+class _PlotPool:
+    """
+    Worker processes for per-function bar plots, started on first use and
+    shared by a whole visualisation sweep. Workers are spawned rather than
+    forked, since the parent runs logging, executor and timer threads whose
+    locks a forked child could inherit mid-use
+    """
+
+    def __init__(self):
+        self.workers = os.cpu_count() or 1
+        self._executor = None
+
+    def plot(self, jobs: List[tuple]):
+        """
+        Render bar plots: small batches in-process, larger ones as one chunk
+        per worker (Agg rendering and PNG encoding are CPU-bound)
+
+        Args:
+            * jobs: Arguments for _plot_function_chunk
+        """
+        if not jobs:
+            return
+
+        # Create output directories once here rather than in every worker
+        for path in {os.path.dirname(job[-1]) for job in jobs}:
+            os.makedirs(path, exist_ok=True)
+
+        workers = min(len(jobs), self.workers)
+        if len(jobs) < _PARALLEL_MIN_PLOTS or workers == 1:
+            _plot_function_chunk(jobs)
+            return
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_plot_worker,
+            )
+        chunks = [jobs[i::workers] for i in range(workers)]
+        list(self._executor.map(_plot_function_chunk, chunks))
+
+    def close(self):
+        """Shut the worker processes down, if any were started"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 def create_similarity_visualizations(
     config: Dict[str, Any], analysis_type: str = "top-functions"
@@ -39,25 +184,36 @@ def create_similarity_visualizations(
             agg = AggregatedResultsPathConstructor(**common)
             viz = VisualizationPathConstructor(**common)
 
-            # Load aggregated embeddings
+            # Load aggregated embeddings, preferring Parquet unless the CSV
+            # was written after it
+            parquet_path = agg.construct_aggregated_embeddings_path(
+                extension="parquet",
+            )
             emb_path = agg.construct_aggregated_embeddings_path()
-            if not os.path.exists(emb_path):
-                logger.error_status(
-                    f"No embeddings found: {emb_path}", exc_info=True
-                )
+            csv_mtime = _mtime(emb_path)
+            parquet_mtime = _mtime(parquet_path)
+            if parquet_mtime is not None and (
+                csv_mtime is None or parquet_mtime >= csv_mtime
+            ):
+                df = pd.read_parquet(parquet_path)
+            elif csv_mtime is not None:
+                df = load_embeddings_csv(emb_path)
+            else:
+                logger.error_status(f"No embeddings found: {emb_path}")
                 raise FileNotFoundError(
                     f"No embeddings found: {emb_path}"
                 )
 
-            # Load and process embeddings
-            df = pd.read_csv(emb_path, index_col=0)
-
             # Get embedding vectors
             regions = df.index.tolist()
             embeddings = df.values
 
-            # Compute similarity matrix
-            similarity_matrix = cosine_similarity(embeddings)
+            # Cosine similarity: L2-normalise the rows once, then a single
+            # self matmul (float32 halves the memory traffic)
+            unit = normalize(
+                embeddings.astype(np.float32, copy=False), axis=1, copy=False,
+            )
+            similarity_matrix = unit @ unit.T
 
             # Create similarity DataFrame
             sim_df = pd.DataFrame(
@@ -72,17 +228,19 @@ def create_similarity_visualizations(
             sim_df.to_csv(path)
 
             # Create visualization
+            annot = sim_df.shape[0] <= _ANNOT_MAX_REGIONS
             plt.figure(figsize=(20, 16))
             sns.heatmap(
                 sim_df,
-                annot=True,
-                fmt=".2f",
+                annot=_annotations(sim_df.to_numpy(), annot),
+                fmt="",
                 cmap="magma",
                 square=True,
                 xticklabels=True,
                 yticklabels=True,
                 annot_kws={"size": 6},
                 cbar_kws={"shrink": 0.5},
+                rasterized=True,
             )
             plt.xticks(rotation=90, fontsize=8)
             plt.yticks(rotation=0, fontsize=8)
@@ -106,8 +264,9 @@ def create_similarity_visualizations(
             visualisation_path = path.replace("csv", "png")
             plt.savefig(
                 visualisation_path,
-                dpi=300,
+                dpi=300 if annot else _LARGE_HEATMAP_DPI,
                 bbox_inches="tight",
+                pil_kwargs=_PNG_KWARGS,
             )
             plt.close()
 
@@ -132,146 +291,140 @@ def create_probability_visualizations(
     """
     hemispheres = ["left", "right"] if config.separate_hemispheres else [None]
 
-    for hemisphere in hemispheres:
-        for model in config.models:
-            common = dict(
-                model=model, species=config.species,
-                atlas_name=config.atlas_name,
-                analysis_type=analysis_type,
-                hemisphere=hemisphere,
-                template_name=config.prompt_template_name,
-            )
-            agg = AggregatedResultsPathConstructor(**common)
-            viz = VisualizationPathConstructor(**common)
-
-            # Load aggregated probabilities
-            agg_path = agg.construct_aggregated_query_results_path(
-                extension="csv",
-            )
-            if not os.path.exists(agg_path):
-                logger.error_status(
-                    f"No probabilities found: {agg_path}", exc_info=True
-                )
-                raise FileNotFoundError(
-                    f"No probabilities found: {agg_path}"
+    # One worker pool for every model/hemisphere in the sweep
+    with _PlotPool() as plot_pool:
+        for hemisphere in hemispheres:
+            for model in config.models:
+                common = dict(
+                    model=model, species=config.species,
+                    atlas_name=config.atlas_name,
+                    analysis_type=analysis_type,
+                    hemisphere=hemisphere,
+                    template_name=config.prompt_template_name,
                 )
+                agg = AggregatedResultsPathConstructor(**common)
+                viz = VisualizationPathConstructor(**common)
 
-            # Load data
-            df = pd.read_csv(agg_path, index_col=0)
-            df = df.fillna(0.0)
-
-            # Create output directory
-            path = viz.construct_visualisations_probability_path(
-                extension="png",
-            )
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-
-            # Create main heatmap
-            plt.figure(
-                figsize=(len(config.functions) * 0.8 + 3, len(df) * 0.3 + 3)
-            )
-
-            # Check if we have negative values
-            has_negative = (df.values < 0).any()
-
-            if has_negative:
-                # Use diverging colormap for negative values
-                sns.heatmap(
-                    df,
-                    annot=True,
-                    fmt=".2f",
-                    cmap="RdBu_r",  # Red for negative, blue for positive
-                    center=0,
-                    vmin=-1,
-                    vmax=1,
-                    xticklabels=True,
-                    yticklabels=True,
-                    annot_kws={"size": 7},
-                    cbar_kws={"shrink": 0.5},
-                )
-            else:
-                # Standard colormap for positive values
-                sns.heatmap(
-                    df,
-                    annot=True,
-                    fmt=".2f",
-                    cmap="magma",
-                    vmin=0,
-                    vmax=1,
-                    xticklabels=True,
-                    yticklabels=True,
-                    annot_kws={"size": 7},
-                    cbar_kws={"shrink": 0.5},
+                # Load aggregated probabilities
+                agg_path = agg.construct_aggregated_query_results_path(
+                    extension="csv",
                 )
-
-            plt.xticks(rotation=45, fontsize=9)
-            plt.yticks(rotation=0, fontsize=8)
-
-            # Title
-            hemi_text = (
-                hemisphere.capitalize()
-                if hemisphere is not None
-                else "No Hemisphere Separation"
-            )
-            atlas_text = f" ({config.atlas_name})" if config.atlas_name else ""
-            plt.title(
-                f"Probabilities - {model} - {hemi_text}{atlas_text}",
-                fontsize=12,
-            )
-
-            # Save main heatmap
-            plt.savefig(path, dpi=300, bbox_inches="tight")
-            plt.close()
-
-            # Create individual function plots
-            for function in config.functions:
-                if function not in df.columns:
+                # Aggregation skips the overview when there are no values
+                if not os.path.exists(agg_path):
+                    logger.warning_status(
+                        f"No probabilities found: {agg_path}"
+                    )
                     continue
 
-                func_data = df[function].dropna()
-                if func_data.empty:
-                    continue
+                # Load data
+                df = pd.read_csv(agg_path, index_col=0)
+                df = df.fillna(0.0)
 
-                # Sort by probability
-                func_data = func_data.sort_values(ascending=True)
+                # Create output directory
+                path = viz.construct_visualisations_probability_path(
+                    extension="png",
+                )
+                os.makedirs(os.path.dirname(path), exist_ok=True)
 
-                plt.figure(figsize=(10, len(func_data) * 0.3 + 2))
+                # Create main heatmap
+                plt.figure(
+                    figsize=(
+                        len(config.functions) * 0.8 + 3,
+                        len(df) * 0.3 + 3,
+                    )
+                )
+
+                # Check if we have negative values
+                has_negative = (df.values < 0).any()
+                annot = len(df) * len(config.functions) <= _ANNOT_MAX_CELLS
+                labels = _annotations(df.to_numpy(), annot)
 
-                # Color bars based on positive/negative values
                 if has_negative:
-                    colors = [
-                        "red" if val < 0 else "blue"
-                        for val in func_data.values
-                    ]
-                    plt.barh(func_data.index, func_data.values, color=colors)
-                    plt.axvline(x=0, color="black", linestyle="-", alpha=0.3)
-                    plt.xlim(-1, 1)
+                    # Use diverging colormap for negative values
+                    sns.heatmap(
+                        df,
+                        annot=labels,
+                        fmt="",
+                        cmap="RdBu_r",  # Red for negative, blue for positive
+                        center=0,
+                        vmin=-1,
+                        vmax=1,
+                        xticklabels=True,
+                        yticklabels=True,
+                        annot_kws={"size": 7},
+                        cbar_kws={"shrink": 0.5},
+                        rasterized=True,
+                    )
                 else:
-                    plt.barh(func_data.index, func_data.values, color="blue")
-                    plt.xlim(0, 1)
+                    # Standard colormap for positive values
+                    sns.heatmap(
+                        df,
+                        annot=labels,
+                        fmt="",
+                        cmap="magma",
+                        vmin=0,
+                        vmax=1,
+                        xticklabels=True,
+                        yticklabels=True,
+                        annot_kws={"size": 7},
+                        cbar_kws={"shrink": 0.5},
+                        rasterized=True,
+                    )
 
-                plt.title(f"{function} - {model} - {hemi_text}")
-                plt.xlabel("Probability")
-                plt.tight_layout()
+                plt.xticks(rotation=45, fontsize=9)
+                plt.yticks(rotation=0, fontsize=8)
 
-                # Get function visualisation path
-                path = viz.construct_visualisations_function_path(
-                    function=function, extension="png",
+                # Title
+                hemi_text = (
+                    hemisphere.capitalize()
+                    if hemisphere is not None
+                    else "No Hemisphere Separation"
+                )
+                atlas_text = (
+                    f" ({config.atlas_name})" if config.atlas_name else ""
+                )
+                plt.title(
+                    f"Probabilities - {model} - {hemi_text}{atlas_text}",
+                    fontsize=12,
                 )
-                os.makedirs(os.path.dirname(path), exist_ok=True)
 
-                # Save function plot
+                # Save main heatmap
                 plt.savefig(
                     path,
-                    dpi=300,
+                    dpi=300 if annot else _LARGE_HEATMAP_DPI,
                     bbox_inches="tight",
+                    pil_kwargs=_PNG_KWARGS,
                 )
                 plt.close()
 
-            logger.processing(
-                f"Created probability visualizations: {model}/"
-                f"{hemisphere if hemisphere else 'no_separation'}"
-            )
+                # Create individual function plots
+                jobs = []
+                for function in config.functions:
+                    if function not in df.columns:
+                        continue
+
+                    func_data = df[function].dropna()
+                    if func_data.empty:
+                        continue
+
+                    # Sort by probability
+                    func_data = func_data.sort_values(ascending=True)
+
+                    jobs.append((
+                        f"{function} - {model} - {hemi_text}",
+                        func_data.index.tolist(),
+                        func_data.tolist(),
+                        bool(has_negative),
+                        viz.construct_visualisations_function_path(
+                            function=function, extension="png",
+                        ),
+                    ))
+                plot_pool.plot(jobs)
+
+                logger.processing(
+                    f"Created probability visualizations: {model}/"
+                    f"{hemisphere if hemisphere else 'no_separation'}"
+                )
 
 
 def create_ranking_visualizations(
@@ -400,6 +553,7 @@ def create_ranking_visualizations(
                 fig.savefig(
                     viz_path, dpi=300,
                     bbox_inches="tight",
+                    pil_kwargs=_PNG_KWARGS,
                 )
                 plt.close(fig)
 
@@ -472,7 +626,8 @@ def create_consistency_visualizations(
             plt.xlabel("Consistency Score")
             plt.tight_layout()
             plt.savefig(
-                viz_path, dpi=300, bbox_inches="tight"
+                viz_path, dpi=300, bbox_inches="tight",
+                pil_kwargs=_PNG_KWARGS,
             )
             plt.close()
 
@@ -0,0 +1,61 @@
+import os
+import functools
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from utils.paths.base import DEFAULT_PATHS
+
+API_KEY_NAMES = ("OPENROUTER_API_KEY", "OPENAI_API_KEY", "HF_TOKEN")
+
+
+def load_api_keys() -> Mapping[str, Optional[str]]:
+    """
+    Load the .env file into os.environ (variables already set are kept) and
+    read API keys from the environment. The result is cached per .env
+    modification time, so the file is only parsed again after it changes.
+    Every .env setting is exported, not just the keys, so SEED, HF_HOME and
+    SDK variables still take effect
+
+    Returns:
+        * Read-only mapping of key name to value (None if unset)
+    """
+    env_file = DEFAULT_PATHS["env_file"]
+    try:
+        mtime = os.stat(env_file).st_mtime_ns
+    except OSError:
+        mtime = None
+    return _load_api_keys(env_file=env_file, mtime=mtime)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_api_keys(
+    env_file: str, mtime: Optional[int],
+) -> Mapping[str, Optional[str]]:
+    """
+    Parse the .env file and export its variables once for a given
+    modification time
+
+    Args:
+        * env_file (str): Path to the .env file
+        * mtime (int | None): File modification time (cache key only), None
+            if the file does not exist
+
+    Returns:
+        * Read-only mapping of key name to value (None if unset)
+    """
+    values = {}
+    if mtime is not None:
+        # Imported here so runs without a .env file skip the dotenv import
+        from dotenv import dotenv_values
+
+        values = dotenv_values(env_file)
+        # Same as load_dotenv(): fill in variables that aren't already set
+        for name, value in values.items():
+            if value is not None:
+                os.environ.setdefault(name, value)
+
+    # Variables already set in the environment take precedence
+    return MappingProxyType({
+        name: os.environ.get(name) or values.get(name)
+        for name in API_KEY_NAMES
+    })
@@ -1,11 +1,16 @@
 import os
+import re
+import csv
 import sys
-import pandas as pd
-from typing import List
+import functools
+from typing import List, Tuple
 
 from utils.misc.logging_setup import logger
 from utils.paths.atlas import AtlasPathConstructor
 
+# Atlas labels carry a "<prefix>_<hemisphere>_" prefix, e.g. "ctx_lh_"
+_REGION_PREFIX_RE = re.compile(r"^[^_]+_[^_]+_")
+
 
 def load_clean_regions(species: str, atlas_path: str) -> List[str]:
     """
@@ -19,19 +24,22 @@ def load_clean_regions(species: str, atlas_path: str) -> List[str]:
         List of cleaned region names
     """
     try:
-        df = pd.read_csv(atlas_path, delimiter=",", header=None)
-        df[0] = df[0].str.replace(r"^[^_]+_[^_]+_", "", regex=True)
-        df[0] = df[0].str.replace(r"'", "", regex=True)
-        df[0] = df[0].str.lower()
-
         # "bankssts" is a Desikan-Killiany atlas abbreviation;
         # expand for LLM comprehension
-        if species.lower() == "human":
-            df[0] = df[0].str.replace(
-                "bankssts", "banks of the superior temporal sulcus"
-            )
-
-        regions = df[0].to_list()
+        expand_bankssts = species.lower() == "human"
+
+        regions = []
+        with open(atlas_path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                region = _REGION_PREFIX_RE.sub("", row[0])
+                region = region.replace("'", "").lower()
+                if expand_bankssts:
+                    region = region.replace(
+                        "bankssts", "banks of the superior temporal sulcus"
+                    )
+                regions.append(region)
         return regions
     except Exception as e:
         logger.error_status(
@@ -59,14 +67,34 @@ def load_regions_for_species(
         species=species, atlas_name=atlas_name
     )
 
-    if not os.path.exists(atlas_path):
-        logger.error_status(
-            f"Atlas file not found: {atlas_path}", exc_info=True
-        )
-        raise
+    try:
+        mtime = os.stat(atlas_path).st_mtime_ns
+    except OSError:
+        logger.error_status(f"Atlas file not found: {atlas_path}")
+        raise FileNotFoundError(atlas_path)
 
     # Load all regions from the atlas
-    return load_clean_regions(species=species, atlas_path=atlas_path)
+    return list(_load_atlas_regions(
+        species=species, atlas_path=atlas_path, mtime=mtime,
+    ))
+
+
+@functools.lru_cache(maxsize=16)
+def _load_atlas_regions(
+    species: str, atlas_path: str, mtime: int,
+) -> Tuple[str, ...]:
+    """
+    Parse an atlas file once for a given modification time
+
+    Args:
+        * species: Species name
+        * atlas_path: Path to the atlas CSV file
+        * mtime (int): File modification time (cache key only)
+
+    Returns:
+        * Tuple of cleaned region names
+    """
+    return tuple(load_clean_regions(species=species, atlas_path=atlas_path))
 
 
 def validate_analysis_inputs(args):
@@ -94,6 +122,10 @@ def validate_analysis_inputs(args):
         logger.error_status("--species is required")
         sys.exit(1)
 
+    if args.json_mode and args.justify:
+        logger.error_status("--json-mode cannot be combined with --justify")
+        sys.exit(1)
+
     if args.command == "rank-pairs":
         if not (args.atlas_name or args.regions or args.pairs):
             logger.error_status(
@@ -0,0 +1,56 @@
+import json
+from typing import Any
+
+import numpy as np
+
+# orjson is optional: used when installed, otherwise fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Serialise NumPy values for stdlib json"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serialise to a JSON string, accepting NumPy arrays and scalars
+
+    Args:
+        * obj: JSON-serialisable value (may contain NumPy arrays)
+        * indent (bool): Pretty-print with two-space indentation instead of
+            the compact form
+
+    Returns:
+        * JSON string
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode()
+    if indent:
+        return json.dumps(obj, default=_default, indent=2)
+    return json.dumps(obj, default=_default, separators=(",", ":"))
+
+
+def loads(data: Any) -> Any:
+    """
+    Parse a JSON string or bytes
+
+    Args:
+        * data: JSON text (str or bytes)
+
+    Returns:
+        * The parsed value
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
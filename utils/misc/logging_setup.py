@@ -1,6 +1,10 @@
 import logging
+import logging.handlers
 import sys
 import os
+import queue
+import atexit
+import multiprocessing
 import platform
 
 # Define custom log levels
@@ -12,79 +16,123 @@ logging.addLevelName(PROCESSING_LEVEL, "PROCESSING")
 logging.addLevelName(SUCCESS_LEVEL, "SUCCESS")
 
 
+def _compute_supports_color() -> bool:
+    """Detect whether stdout is a terminal that understands ANSI colors"""
+    return (
+        hasattr(sys.stdout, "isatty")
+        and sys.stdout.isatty()
+        and (
+            platform.system() != "Windows"
+            or "ANSICON" in os.environ
+            or "WT_SESSION" in os.environ
+            or os.environ.get("TERM", "").startswith("xterm")
+        )
+    )
+
+
+# Color support and palette, computed once at import and shared by every
+# formatter
+_SUPPORTS_COLOR = _compute_supports_color()
+if _SUPPORTS_COLOR:
+    _COLORS = {
+        "DEBUG": "\033[36m",        # Cyan
+        "INFO": "\033[37m",         # White
+        "PROCESSING": "\033[34m",   # Blue
+        "SUCCESS": "\033[32m",      # Green
+        "WARNING": "\033[33m",      # Yellow
+        "ERROR": "\033[31m",        # Red
+        "CRITICAL": "\033[35m",     # Magenta
+    }
+    _RESET = "\033[0m"
+    _BOLD = "\033[1m"
+else:
+    _COLORS = {}
+    _RESET = ""
+    _BOLD = ""
+
+# Colored levelnames and message color wrappers, built once per level
+_COLORED_LEVELNAME = {
+    level: f"{color}{_BOLD}{level}{_RESET}" for level, color in _COLORS.items()
+}
+_MESSAGE_COLOR = {level: (color, _RESET) for level, color in _COLORS.items()}
+
+
 class ColoredFormatter(logging.Formatter):
     """Formatter to add colors to log levels"""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Color support detection
-        self.supports_color = (
-            hasattr(sys.stdout, "isatty")
-            and sys.stdout.isatty()
-            and (
-                platform.system() != "Windows"
-                or "ANSICON" in os.environ
-                or "WT_SESSION" in os.environ
-                or os.environ.get("TERM", "").startswith("xterm")
-            )
-        )
+        self.supports_color = _SUPPORTS_COLOR
+        self.COLORS = _COLORS
+        self.RESET = _RESET
+        self.BOLD = _BOLD
 
-        if self.supports_color:
-            self.COLORS = {
-                "DEBUG": "\033[36m",        # Cyan
-                "INFO": "\033[37m",         # White
-                "PROCESSING": "\033[34m",   # Blue
-                "SUCCESS": "\033[32m",      # Green
-                "WARNING": "\033[33m",      # Yellow
-                "ERROR": "\033[31m",        # Red
-                "CRITICAL": "\033[35m",     # Magenta
-            }
-            self.RESET = "\033[0m"
-            self.BOLD = "\033[1m"
-        else:
-            self.COLORS = {}
-            self.RESET = ""
-            self.BOLD = ""
+        # Status symbols prefixed by the logger's status methods
+        self._status_prefixes = ("✓", "✗", "⚠", "⧗")
+        self._colored_levelname = _COLORED_LEVELNAME
+        self._message_color = _MESSAGE_COLOR
 
     def format(self, record):
-        if self.supports_color and record.levelname in self.COLORS:
-            # Check if this is a status message (has status symbols)
-            message = record.getMessage()
-            is_status_message = any(
-                message.startswith(symbol) for symbol in ["✓", "✗", "⚠", "⧗"]
-            )
+        # Uncolored records skip the status-message check entirely
+        if not self.supports_color or record.levelname not in self.COLORS:
+            return super().format(record)
 
-            # Create a copy to avoid modifying original
-            record_copy = logging.makeLogRecord(record.__dict__)
+        # Check if this is a status message (has status symbols)
+        message = record.getMessage()
+        is_status_message = message.startswith(self._status_prefixes)
 
+        # Color the record in place and restore it afterwards, so other
+        # handlers see the original (handlers run one at a time)
+        levelname, msg, args = record.levelname, record.msg, record.args
+        try:
+            # Color the levelname, and for status messages the message too
+            record.levelname = self._colored_levelname[levelname]
             if is_status_message:
-                # For status messages: color both levelname AND message
-                colored_levelname = (
-                    f"{self.COLORS[record.levelname]}{self.BOLD}"
-                    f"{record.levelname}{self.RESET}"
-                )
-                colored_message = (
-                    f"{self.COLORS[record.levelname]}{message}{self.RESET}"
-                )
-                record_copy.levelname = colored_levelname
-                record_copy.msg = colored_message
-                record_copy.args = ()
-            else:
-                # For regular messages: just color levelname
-                colored_levelname = (
-                    f"{self.COLORS[record.levelname]}{self.BOLD}"
-                    f"{record.levelname}{self.RESET}"
-                )
-                record_copy.levelname = colored_levelname
-
-            return super().format(record_copy)
-        else:
+                start, end = self._message_color[levelname]
+                record.msg = f"{start}{message}{end}"
+                record.args = ()
             return super().format(record)
+        finally:
+            record.levelname, record.msg, record.args = levelname, msg, args
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    FileHandler that writes each record in one call and leaves flushing to
+    flush(), so records collect in the file buffer between flushes
+    """
+
+    def _open(self):
+        return open(
+            self.baseFilename, self.mode, buffering=64 * 1024,
+            encoding=self.encoding, errors=self.errors,
+        )
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _BatchingHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler that also flushes its target's stream after a batch"""
+
+    def flush(self):
+        with self.lock:
+            super().flush()
+            if self.target is not None:
+                self.target.flush()
 
 
 def add_status_methods():
-    """Add status methods to logger class"""
+    """
+    Add status methods to logger class. Like the stdlib methods they take
+    %-style arguments, e.g. logger.processing("Querying %s", region), so the
+    message is only formatted when the record is actually emitted; prefer
+    that over f-strings in per-region/per-function loops
+    """
 
     def success(self, message, *args, **kwargs):
         if self.isEnabledFor(SUCCESS_LEVEL):
@@ -109,31 +157,57 @@ def add_status_methods():
     logging.Logger.processing = processing
 
 
+# Background thread that owns the real handlers (see setup_logging)
+listener = None
+
+
 def setup_logging():
-    """Configure logging with colors and status methods"""
+    """
+    Configure logging with colors and status methods. The root logger only
+    gets a QueueHandler, so logging calls just enqueue the record; a
+    QueueListener thread formats and writes it to the file and console
+    """
+    global listener
+
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
-    # Clear existing handlers
+    # Clear existing handlers (and stop a previous listener)
     if logger.handlers:
-        for handler in logger.handlers:
+        for handler in list(logger.handlers):
             logger.removeHandler(handler)
+    if listener is not None:
+        listener.stop()
+        atexit.unregister(listener.stop)
 
     # File handler (no colors) - overwrite log file each run
-    file_handler = logging.FileHandler(
+    file_handler = _BufferedFileHandler(
         "llm_prompting.log", mode="w", encoding="utf-8"
     )
     file_handler.setFormatter(
         logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     )
-    logger.addHandler(file_handler)
+    # Batch file writes: flush every 512 records, or at once on an error.
+    # logging.shutdown() flushes whatever is left at exit
+    buffered_file_handler = _BatchingHandler(
+        capacity=512, flushLevel=logging.ERROR, target=file_handler,
+    )
 
     # Console handler (with colors)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(
         ColoredFormatter("%(asctime)s - %(levelname)s - %(message)s")
     )
-    logger.addHandler(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(
+        log_queue, buffered_file_handler, console_handler,
+        respect_handler_level=True,
+    )
+    listener.start()
+    # Drain the queue on exit so no messages are lost
+    atexit.register(listener.stop)
 
     # Add custom status methods
     add_status_methods()
@@ -141,5 +215,14 @@ def setup_logging():
     return logger
 
 
-# Initialize logger
-logger = setup_logging()
+# Initialize logger. Spawned workers (e.g. the plot pool) re-import this
+# module; they must not truncate the parent's log file or start their own
+# listener, so they only get the status methods (warnings and errors still
+# reach stderr through logging's last-resort handler). The process name is
+# checked, since parent_process() is not yet set while a spawned child
+# re-imports the main module
+if multiprocessing.current_process().name == "MainProcess":
+    logger = setup_logging()
+else:
+    add_status_methods()
+    logger = logging.getLogger()
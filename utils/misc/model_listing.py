@@ -1,7 +1,4 @@
-import os
-
-import requests
-
+from utils.misc.api_keys import load_api_keys
 from utils.misc.logging_setup import logger
 from utils.misc.variables import OPENROUTER_BASE_URL
 
@@ -33,24 +30,52 @@ def _format_cost(value: float) -> str:
     return "free" if value == 0.0 else f"${value:.2f}"
 
 
-def _print_table(models: list):
+def _bucket_models(models: list) -> dict[str, list]:
+    """
+    Parse each model's pricing once and split models into 'all', 'free'
+    (zero total cost) and 'paid' (positive total cost) buckets, each sorted
+    by model ID
+
+    Args:
+        * models (list): List of model dictionaries from OpenRouter API
+
+    Returns:
+        * dict[str, list]: Bucket name to list of
+            (model, prompt_cost_per_m, completion_cost_per_m) rows
+    """
+    rows = sorted(
+        ((m, *_get_costs(model=m)) for m in models),
+        key=lambda row: row[0].get("id", ""),
+    )
+    buckets = {"all": rows, "free": [], "paid": []}
+    for row in rows:
+        # Negative (dynamic) or NaN totals are neither free nor paid
+        total = row[1] + row[2]
+        if total == 0.0:
+            buckets["free"].append(row)
+        elif total > 0.0:
+            buckets["paid"].append(row)
+    return buckets
+
+
+def _print_table(rows: list):
     """
     Print the standard model table with columns: Model ID, Name, Context
     Length, Prompt Cost/1M, Completion Cost/1M
 
     Args:
-        * models (list): List of model dictionaries from OpenRouter API
+        * rows (list): (model, prompt_cost_per_m, completion_cost_per_m)
+            rows from _bucket_models()
     """
     print(
         f"{'Model ID':<50} {'Name':<40} {'Context':<10} "
         f"{'Prompt $/1M':<14} {'Completion $/1M'}"
     )
     print("-" * 140)
-    for model in models:
+    for model, prompt, completion in rows:
         model_id = model.get("id", "")
         name = model.get("name", "")[:38]
         context = model.get("context_length", "?")
-        prompt, completion = _get_costs(model)
         print(
             f"{model_id:<50} {name:<40} {str(context):<10} "
             f"{_format_cost(prompt):<14} {_format_cost(completion)}"
@@ -68,7 +93,7 @@ def list_available_models(filter: str = "all"):
     """
 
     # Get API key from environment
-    api_key = os.environ.get("OPENROUTER_API_KEY")
+    api_key = load_api_keys()["OPENROUTER_API_KEY"]
     if not api_key:
         logger.error(
             "OPENROUTER_API_KEY not found in .env file. "
@@ -76,7 +101,9 @@ def list_available_models(filter: str = "all"):
         )
         return
 
-    # Fetch models from OpenRouter
+    # Fetch models from OpenRouter (requests is only needed here)
+    import requests
+
     response = requests.get(
         f"{OPENROUTER_BASE_URL}/models",
         headers={"Authorization": f"Bearer {api_key}"},
@@ -92,40 +119,37 @@ def list_available_models(filter: str = "all"):
         if m.get("architecture", {}).get("modality", "").endswith("->text")
     ]
 
+    # Price every model once, then pick the requested bucket
+    buckets = _bucket_models(models=models)
+
     # Display only free models
     if filter == "free":
-        models = [
-            m for m in models
-            if sum(_get_costs(model=m)) == 0.0
-        ]
-        models.sort(key=lambda m: m.get("id", ""))
-        print(f"\n=== Free models ({len(models)} total) ===\n")
-        _print_table(models=models)
+        rows = buckets["free"]
+        print(f"\n=== Free models ({len(rows)} total) ===\n")
+        _print_table(rows=rows)
 
     # Display only paid models, showing top 3 cheapest per provider
     elif filter == "paid":
-        models = [m for m in models if sum(_get_costs(model=m)) > 0.0]
-
         # Group by provider (part before the first '/')
         by_provider: dict[str, list] = {}
-        for m in models:
-            provider = m.get("id", "").split("/")[0]
-            by_provider.setdefault(provider, []).append(m)
+        for row in buckets["paid"]:
+            provider = row[0].get("id", "").split("/")[0]
+            by_provider.setdefault(provider, []).append(row)
 
         # Sort each provider's models by combined cost, keep top 3
         print("\n=== Cheapest 3 paid models per provider ===\n")
         for provider in sorted(by_provider):
             cheapest = sorted(
-                by_provider[provider], key=lambda m: sum(_get_costs(model=m))
+                by_provider[provider], key=lambda row: row[1] + row[2]
             )[:3]
             label = f" {provider} "
             print(f"{label:─^140}")
-            _print_table(models=cheapest)
+            _print_table(rows=cheapest)
             print()
 
     else:  # all
-        models.sort(key=lambda m: m.get("id", ""))
-        print(f"\n=== All chat models ({len(models)} total) ===\n")
-        _print_table(models=models)
+        rows = buckets["all"]
+        print(f"\n=== All chat models ({len(rows)} total) ===\n")
+        _print_table(rows=rows)
 
     print("\nUsage: --models 'openai/gpt-4o-mini,anthropic/claude-3.5-sonnet'")
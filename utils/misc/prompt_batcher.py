@@ -0,0 +1,122 @@
+import threading
+
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class RequestBatcher:
+    """Coalesces concurrent requests sharing a key into one batched call"""
+
+    def __init__(
+        self,
+        send_batch: Callable[[Hashable, List[Any]], List[Any]],
+        batch_size: int,
+        window: float = 0.05,
+    ):
+        """
+        Set up an empty batcher
+
+        Args:
+            * send_batch: (key, items) -> results, one result per item in the
+                same order
+            * batch_size (int): Maximum items sent in one call
+            * window (float): Seconds to wait for more items before sending
+                a partial batch
+        """
+        self._send_batch = send_batch
+        self.batch_size = batch_size
+        self.window = window
+        self._pending: Dict[Hashable, List[Tuple[Any, Future]]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, item: Any) -> Future:
+        """
+        Queue an item. The batch is sent once it is full or the window
+        elapses, whichever comes first
+
+        Args:
+            * key: Items are only batched with others under the same key
+            * item: Request payload passed to send_batch
+
+        Returns:
+            * Future resolving to this item's result
+        """
+        future = Future()
+        ready = None
+        with self._lock:
+            batch = self._pending.setdefault(key, [])
+            batch.append((item, future))
+            if len(batch) == 1:
+                timer = threading.Timer(
+                    self.window, self._flush, args=(key, batch)
+                )
+                timer.daemon = True
+                timer.start()
+            if len(batch) >= self.batch_size:
+                ready = self._pending.pop(key)
+
+        if ready is not None:
+            self._dispatch(key=key, items=ready)
+        return future
+
+    def _flush(self, key: Hashable, batch: list) -> None:
+        """Send a partial batch, unless it was already sent when it filled"""
+        with self._lock:
+            if self._pending.get(key) is not batch:
+                return
+            del self._pending[key]
+        self._dispatch(key=key, items=batch)
+
+    def _dispatch(
+        self, key: Hashable, items: List[Tuple[Any, Future]],
+    ) -> None:
+        """Send one batched call and resolve each item's future"""
+        try:
+            results = self._send_batch(key, [item for item, _ in items])
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+
+class PromptBatcher(RequestBatcher):
+    """Coalesces concurrent prompts for the same model into fused requests"""
+
+    def __init__(
+        self,
+        send_batch: Callable[[str, List[str], Any], List[str]],
+        batch_size: int,
+        window: float = 0.05,
+    ):
+        """
+        Set up an empty batcher
+
+        Args:
+            * send_batch: (model_name, prompts, temperature) -> answers, one
+                answer per prompt in the same order
+            * batch_size (int): Maximum prompts fused into one request
+            * window (float): Seconds to wait for more prompts before sending
+                a partial batch
+        """
+        super().__init__(
+            send_batch=lambda key, prompts: send_batch(key[0], prompts, key[1]),
+            batch_size=batch_size,
+            window=window,
+        )
+
+    def submit(self, model_name: str, prompt: str, temperature: Any) -> Future:
+        """
+        Queue a prompt for a fused request
+
+        Args:
+            * model_name (str): OpenRouter model ID
+            * prompt (str): Prompt to send
+            * temperature: Temperature override (prompts are only fused with
+                others that use the same temperature)
+
+        Returns:
+            * Future resolving to the model's answer for this prompt
+        """
+        return super().submit(key=(model_name, temperature), item=prompt)
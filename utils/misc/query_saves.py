@@ -1,64 +1,203 @@
 import os
+import csv
 import json
-import pandas as pd
-import time
-from typing import Dict, Any, Callable
-
-from utils.misc.logging_setup import logger
+import numpy as np
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Any, Callable, List, Tuple
+
+# fcntl is POSIX-only; Windows falls back to msvcrt byte-range locks
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 from utils.paths.query import QueryPathConstructor
 from utils.paths.embeddings import EmbeddingsPathConstructor
 
+# Last data written to each JSON file, keyed by the file's stat signature.
+# Every write replaces the file (new inode), so a matching signature means
+# nobody else has written it since and the parse can be skipped
+_JSON_CACHE_SIZE = 1024
+_json_cache: "OrderedDict[str, Tuple[tuple, Any]]" = OrderedDict()
+_json_cache_lock = threading.Lock()
 
-def _locked_json_write(filepath: str, update_fn: Callable):
+# Directories already created by this process, so repeated saves into the
+# same trial directory skip the makedirs stat walk
+_ensured_dirs = set()
+_ensured_dirs_lock = threading.Lock()
+
+
+def _ensure_parent_dir(filepath: str) -> None:
     """
-    Safely read-modify-write a JSON file under a lock
+    Create the parent directory of a file unless this process already has
 
     Args:
-        * filepath: Path to JSON file
-        * update_fn: callable(existing_data) -> updated_data
+        * filepath: Path to the file about to be written
+    """
+    directory = os.path.dirname(filepath)
+    if directory in _ensured_dirs:
+        return
+    os.makedirs(directory, exist_ok=True)
+    with _ensured_dirs_lock:
+        _ensured_dirs.add(directory)
+
 
-    Raises:
-        * Exception if lock cannot be obtained after 3 attempts
+def forget_created_dirs() -> None:
+    """
+    Clear the record of created directories. Call after deleting results
+    directories, so later saves create them again
     """
+    with _ensured_dirs_lock:
+        _ensured_dirs.clear()
 
-    lock_file = f"{filepath}.lock"
 
-    # Acquire lock (max 3 attempts)
-    for attempt in range(3):
+@contextmanager
+def _file_lock(lock_path: str):
+    """
+    Hold an exclusive lock on a sidecar lock file, blocking until it is
+    free. The OS drops the lock if the process dies, so a crash can't leave
+    a stale lock behind. The lock file is never removed, keeping every
+    writer on the same inode
+
+    Args:
+        * lock_path: Path to the lock file (created if missing)
+    """
+    fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            # LK_LOCK gives up after ~10s of retries, so keep trying
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
         try:
-            # Create lock file (fails if already exists)
-            with open(lock_file, "x") as lock:
-                lock.write(str(os.getpid()))
-            break
-        except FileExistsError:
-            if attempt < 2:
-                time.sleep(0.1 * (attempt + 1))
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
             else:
-                logger.error_status(
-                    f"Could not get lock for {filepath} "
-                    "after 3 attempts",
-                    exc_info=True,
-                )
-                raise
-
-    # Read-modify-write under lock
-    try:
-        data = {}
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, "r") as f:
-                    data = json.load(f)
-            except (json.JSONDecodeError, OSError):
-                data = {}
-        data = update_fn(data)
-        with open(filepath, "w") as f:
-            json.dump(data, f, indent=2)
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
     finally:
+        os.close(fd)
+
+
+def _atomic_write_json(filepath: str, data: Any):
+    """
+    Write JSON to a temporary file, fsync it and rename it over the target,
+    so readers (and a crash mid-write) only ever see the old or the new
+    complete file
+
+    Args:
+        * filepath: Path to JSON file
+        * data: JSON-serialisable data
+    """
+    tmp = f"{filepath}.tmp.{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                data, f, separators=(",", ":"), ensure_ascii=False,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filepath)
+    except BaseException:
         try:
-            os.remove(lock_file)
+            os.remove(tmp)
         except OSError:
             pass
+        raise
+
+
+def _stat_signature(filepath: str):
+    """
+    Return (inode, mtime, size) for a file, or None if it does not exist
+
+    Args:
+        * filepath: Path to the file
+    """
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _copy_json(data: Any) -> Any:
+    """
+    Copy JSON data (nested dicts and lists of immutable scalars), much
+    faster than copy.deepcopy. Tuples become lists, as on a re-read
+
+    Args:
+        * data: JSON-serialisable data
+
+    Returns:
+        * Copy sharing no dict or list with data
+    """
+    if isinstance(data, dict):
+        return {key: _copy_json(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [_copy_json(value) for value in data]
+    return data
+
+
+def _update_json_unlocked(filepath: str, update_fn: Callable):
+    """
+    Read-modify-write a JSON file (caller holds the file's lock)
+
+    Args:
+        * filepath: Path to JSON file
+        * update_fn: callable(existing_data) -> updated_data
+    """
+    # Taken out of the cache while updating, so a failed update can't
+    # leave a half-modified entry behind. The entry is a private copy, so
+    # once popped it can be handed to update_fn as fresh data
+    with _json_cache_lock:
+        cached = _json_cache.pop(filepath, None)
+
+    signature = _stat_signature(filepath)
+    if signature is None:
+        data = {}
+    elif cached is not None and cached[0] == signature:
+        data = cached[1]
+    else:
+        try:
+            with open(filepath, encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            data = {}
+
+    data = update_fn(data)
+    _atomic_write_json(filepath=filepath, data=data)
+
+    signature = _stat_signature(filepath)
+    if signature is not None:
+        with _json_cache_lock:
+            # Copied, so later changes to the caller's data can't alter
+            # what the cache says was written
+            _json_cache[filepath] = (signature, _copy_json(data))
+            while len(_json_cache) > _JSON_CACHE_SIZE:
+                _json_cache.popitem(last=False)
+
+
+def _locked_json_write(filepath: str, update_fn: Callable):
+    """
+    Safely read-modify-write a JSON file under a lock
+
+    Args:
+        * filepath: Path to JSON file
+        * update_fn: callable(existing_data) -> updated_data
+    """
+    with _file_lock(f"{filepath}.lock"):
+        _update_json_unlocked(filepath=filepath, update_fn=update_fn)
 
 
 def _save_json_update(filepath: str, new_data: Dict[str, Any]):
@@ -69,10 +208,30 @@ def _save_json_update(filepath: str, new_data: Dict[str, Any]):
         * filepath: Path to JSON file
         * new_data: Dictionary of data to add/update
     """
-    def _update(data):
-        data.update(new_data)
-        return data
-    _locked_json_write(filepath=filepath, update_fn=_update)
+    _save_json_updates_batch(updates={filepath: new_data})
+
+
+def _save_json_updates_batch(updates: Dict[str, Dict[str, Any]]):
+    """
+    Shallow-merge new data into several JSON files as one step. All the
+    files' locks are held together (taken in path order, so concurrent
+    batches can't deadlock), and readers that take the locks see either
+    none or all of the updates
+
+    Args:
+        * updates: Mapping of JSON file path to the data to add/update
+    """
+    paths = sorted(updates)
+    with ExitStack() as stack:
+        for path in paths:
+            stack.enter_context(_file_lock(f"{path}.lock"))
+        for path in paths:
+            new_data = updates[path]
+
+            def _update(data, new_data=new_data):
+                data.update(new_data)
+                return data
+            _update_json_unlocked(filepath=path, update_fn=_update)
 
 
 def _save_json_deep_merge(
@@ -103,6 +262,66 @@ def _save_json_deep_merge(
     _locked_json_write(filepath=filepath, update_fn=_merge)
 
 
+def load_embeddings_csv(path: str) -> "pd.DataFrame":
+    """
+    Read an embeddings CSV (index column plus dim_* columns) as float32.
+    The header is read first so only the value columns get the float32
+    dtype, which halves memory against pandas' float64 default
+
+    Args:
+        * path: Path to the embeddings CSV
+
+    Returns:
+        * DataFrame indexed by the first column, float32 values
+    """
+    # Imported here: saving only needs csv, so task workers that never read
+    # embeddings back don't pay for the pandas import
+    import pandas as pd
+
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    return pd.read_csv(
+        path,
+        index_col=0,
+        dtype={name: np.float32 for name in header[1:]},
+        engine="c",
+        memory_map=True,
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _embeddings_header(dims: int) -> Tuple[str, ...]:
+    """
+    Build the embeddings CSV header (blank index name, then dim_0...)
+
+    Args:
+        * dims (int): Embedding dimensionality
+
+    Returns:
+        * Header fields
+    """
+    return ("", *(f"dim_{i}" for i in range(dims)))
+
+
+def _write_embeddings_csv(path: str, index: List[str], vectors) -> None:
+    """
+    Write embedding vectors in the same layout as DataFrame.to_csv (index
+    column plus dim_* columns), without building a DataFrame
+
+    Args:
+        * path: Output CSV path
+        * index: Row labels, one per vector
+        * vectors: Embedding vectors (lists or a NumPy array)
+    """
+    values = np.asarray(vectors, dtype=np.float32)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(_embeddings_header(values.shape[1]))
+        # 9 significant digits round-trip float32 exactly
+        for label, row in zip(index, values.tolist()):
+            writer.writerow([label, *(f"{v:.9g}" for v in row)])
+
+
 def _save_function_results(
     model: str,
     config: Dict[str, Any],
@@ -159,43 +378,36 @@ def _save_function_results(
     clean_path = query.construct_query_cleaned_region_path(
         region=region, trial=trial,
     )
-    os.makedirs(os.path.dirname(clean_path), exist_ok=True)
-    _save_json_update(
-        filepath=clean_path, new_data={model: functions},
-    )
+    _ensure_parent_dir(filepath=clean_path)
+    updates = {clean_path: {model: functions}}
 
     # Combined embedding
     emb_path = emb.construct_embeddings_region_path(
         region=region, trial=trial,
     )
-    os.makedirs(os.path.dirname(emb_path), exist_ok=True)
-    df = pd.DataFrame([embedding])
-    df.columns = [f"dim_{i}" for i in range(len(embedding))]
-    df.index = [region]
-    df.to_csv(emb_path)
+    _ensure_parent_dir(filepath=emb_path)
+    _write_embeddings_csv(path=emb_path, index=[region], vectors=[embedding])
 
     # Per-function embeddings (one row per function)
     if per_function_embeddings is not None:
         pf_path = emb.construct_per_function_embeddings_region_path(
             region=region, trial=trial,
         )
-        os.makedirs(os.path.dirname(pf_path), exist_ok=True)
-        pf_df = pd.DataFrame(per_function_embeddings)
-        pf_df.columns = [
-            f"dim_{i}" for i in range(len(per_function_embeddings[0]))
-        ]
-        pf_df.index = functions
-        pf_df.to_csv(pf_path)
+        _ensure_parent_dir(filepath=pf_path)
+        _write_embeddings_csv(
+            path=pf_path, index=functions, vectors=per_function_embeddings,
+        )
 
     # Justification
     if justification:
         just_path = query.construct_query_justification_region_path(
             region=region, trial=trial,
         )
-        os.makedirs(os.path.dirname(just_path), exist_ok=True)
-        _save_json_update(
-            filepath=just_path, new_data={model: justification},
-        )
+        _ensure_parent_dir(filepath=just_path)
+        updates[just_path] = {model: justification}
+
+    # Cleaned functions and justification are written in one locked batch
+    _save_json_updates_batch(updates=updates)
 
 
 def _save_probability_results(
@@ -233,21 +445,17 @@ def _save_probability_results(
     query_path = query.construct_query_region_path(
         region=region, trial=trial,
     )
-    os.makedirs(os.path.dirname(query_path), exist_ok=True)
-    _save_json_update(
-        filepath=query_path,
-        new_data={function: {model: probability}},
-    )
+    _ensure_parent_dir(filepath=query_path)
+    updates = {query_path: {function: {model: probability}}}
 
     if justification:
         just_path = query.construct_query_justification_region_path(
             region=region, trial=trial,
         )
-        os.makedirs(os.path.dirname(just_path), exist_ok=True)
-        _save_json_update(
-            filepath=just_path,
-            new_data={function: {model: justification}},
-        )
+        _ensure_parent_dir(filepath=just_path)
+        updates[just_path] = {function: {model: justification}}
+
+    _save_json_updates_batch(updates=updates)
 
 
 def _save_ranking_results(
@@ -287,21 +495,17 @@ def _save_ranking_results(
     path = query.construct_query_pair_path(
         region_1=region_1, region_2=region_2, trial=trial,
     )
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    _save_json_update(
-        filepath=path,
-        new_data={function: {model: ranking}},
-    )
+    _ensure_parent_dir(filepath=path)
+    updates = {path: {function: {model: ranking}}}
 
     if justification:
         just_path = query.construct_query_pair_justification_path(
             region_1=region_1, region_2=region_2, trial=trial,
         )
-        os.makedirs(os.path.dirname(just_path), exist_ok=True)
-        _save_json_update(
-            filepath=just_path,
-            new_data={function: {model: justification}},
-        )
+        _ensure_parent_dir(filepath=just_path)
+        updates[just_path] = {function: {model: justification}}
+
+    _save_json_updates_batch(updates=updates)
 
 
 def _save_retest_summary(
@@ -332,7 +536,7 @@ def _save_retest_summary(
     path = query.construct_query_retest_summary_path(
         region=region,
     )
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _ensure_parent_dir(filepath=path)
     _save_json_deep_merge(
         filepath=path, model=model, new_data=summary_data,
     )
@@ -0,0 +1,146 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.misc import fast_json
+from utils.misc.logging_setup import logger
+
+
+class ResponseCache:
+    """
+    Persistent content-addressed cache for model responses (SQLite), with an
+    in-memory LRU tier in front so repeated hits skip the database
+    """
+
+    def __init__(
+        self, path: str, ttl: Optional[float] = None, memory_size: int = 4096,
+    ):
+        """
+        Open (or create) the cache database and prune expired entries
+
+        Args:
+            * path (str): Path to the SQLite database file
+            * ttl (float | None): Seconds before an entry expires, must be
+                positive. None keeps entries forever
+            * memory_size (int): Maximum entries kept in memory
+
+        Raises:
+            * ValueError: If ttl is zero or negative
+        """
+        # A non-positive TTL would store entries that are already expired
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"Cache TTL must be positive, got {ttl}")
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            pruned = self._conn.execute(
+                "DELETE FROM entries WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+        if pruned:
+            logger.info(f"Pruned {pruned} expired cache entries")
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Build a content-addressed key from the given parts
+
+        Args:
+            * *parts: Values identifying the request (model, prompt, ...)
+
+        Returns:
+            * SHA-256 hex digest of the NUL-joined parts
+        """
+        joined = "\0".join(str(p) for p in parts)
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value
+
+        Args:
+            * key (str): Key from make_key()
+
+        Returns:
+            * The cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            value = fast_json.loads(row[0])
+            self._remember(key=key, value=value, expires_at=row[1])
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a JSON-serialisable value under key
+
+        Args:
+            * key (str): Key from make_key()
+            * value: Response string or embedding vector (list or NumPy
+                array) to store
+        """
+        expires_at = (
+            None if self.ttl is None else time.time() + self.ttl
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (key, fast_json.dumps(value), expires_at),
+            )
+            self._remember(key=key, value=value, expires_at=expires_at)
+
+    def _remember(
+        self, key: str, value: Any, expires_at: Optional[float],
+    ) -> None:
+        """Add an entry to the in-memory tier (caller holds the lock)"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss counters since the cache was opened
+
+        Returns:
+            * Dict with memory_hits, disk_hits and misses
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
@@ -106,6 +106,52 @@ JUSTIFY_OUTPUT_FORMATS = {
 }
 
 
+# JSON schemas for --json-mode structured outputs, keyed by prompt type
+RESPONSE_SCHEMAS = {
+    "top-functions": {
+        "name": "top_functions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "functions": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "minItems": 5,
+                    "maxItems": 5,
+                },
+            },
+            "required": ["functions"],
+            "additionalProperties": False,
+        },
+    },
+    "query-functions": {
+        "name": "probability",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "probability": {"type": "number"},
+            },
+            "required": ["probability"],
+            "additionalProperties": False,
+        },
+    },
+    "rankings": {
+        "name": "ranking",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "more_relevant": {"type": "integer", "enum": [1, 2]},
+            },
+            "required": ["more_relevant"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
 BRAINGPT_CONFIG = {
@@ -1,10 +1,12 @@
+import functools
+
 from utils.paths.base import BasePathConstructor
 
 
 class AggregatedResultsPathConstructor(BasePathConstructor):
     """Handles aggregated results path construction"""
 
-    @property
+    @functools.cached_property
     def aggregated_query_results_dir(self):
         """
         Construct path for saving aggregated query results
@@ -12,13 +14,7 @@ class AggregatedResultsPathConstructor(BasePathConstructor):
         Returns:
             * Path to the aggregated query results dir
         """
-        base_dir = f"results/aggregated/{self.analysis_type}"
-
-        return (
-            f"{base_dir}/{self.species}/{self._atlas_segment}/"
-            f"{self.model}/{self.template_name}/"
-            f"{self._hemisphere_segment}"
-        )
+        return f"results/aggregated/{self._run_segment}"
 
     def construct_aggregated_query_results_path(
         self, extension: str = "json",
@@ -53,16 +49,19 @@ class AggregatedResultsPathConstructor(BasePathConstructor):
         )
         return f"{func_dir}/probabilities.csv"
 
-    def construct_aggregated_embeddings_path(self):
+    def construct_aggregated_embeddings_path(self, extension: str = "csv"):
         """
-        Construct path for saving an aggregated embeddings CSV
+        Construct path for saving aggregated embeddings
         (combined/mean embeddings, one row per region)
 
+        Args:
+            * extension: File extension, "csv" or "parquet" (default: "csv")
+
         Returns:
-            * Path to the aggregated embeddings CSV file
+            * Path to the aggregated embeddings file
         """
         aggregated_dir = self.aggregated_query_results_dir
-        return f"{aggregated_dir}/all_embeddings.csv"
+        return f"{aggregated_dir}/all_embeddings.{extension}"
 
     def construct_aggregated_per_function_embeddings_path(self):
         """
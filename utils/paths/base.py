@@ -9,6 +9,15 @@ DEFAULT_PATHS = {
     },
     "atlas": "./atlases",
     "env_file": ".env",
+    "cache_dir": "results/cache",
+}
+
+# Hemisphere directory segments for the usual values; anything else is
+# built on the fly
+_HEMISPHERE_SEGMENTS = {
+    None: "no_separation",
+    "left": "separation/left",
+    "right": "separation/right",
 }
 
 
@@ -32,11 +41,18 @@ class BasePathConstructor(ABC):
         self.template_name = template_name
 
         # Pre-compute common path segments
-        self._hemisphere_segment = (
-            f"separation/{hemisphere}" if hemisphere else "no_separation"
-        )
+        self._hemisphere_segment = _HEMISPHERE_SEGMENTS.get(
+            hemisphere
+        ) or (f"separation/{hemisphere}" if hemisphere else "no_separation")
         self._atlas_segment = atlas_name if atlas_name else "no_atlas"
 
+        # Shared {type}/{species}/{atlas}/{model}/{template}/{hemisphere}
+        # tail of every results directory, built once per instance
+        self._run_segment = (
+            f"{analysis_type}/{species}/{self._atlas_segment}/{model}/"
+            f"{template_name}/{self._hemisphere_segment}"
+        )
+
     @staticmethod
     def get_raw_results_dir():
         """
@@ -57,7 +73,22 @@ class BasePathConstructor(ABC):
         """
         import shutil
         import os
+        from concurrent.futures import ThreadPoolExecutor
 
         raw_dir = BasePathConstructor.get_raw_results_dir()
-        if os.path.exists(raw_dir):
-            shutil.rmtree(raw_dir)
+        try:
+            with os.scandir(raw_dir) as it:
+                entries = list(it)
+        except FileNotFoundError:
+            return
+
+        # Unlinking is blocking I/O, so the top-level subtrees are removed
+        # in parallel (rmtree itself already walks with scandir)
+        subdirs = [e.path for e in entries if e.is_dir(follow_symlinks=False)]
+        for e in entries:
+            if not e.is_dir(follow_symlinks=False):
+                os.unlink(e.path)
+        if subdirs:
+            with ThreadPoolExecutor(max_workers=min(8, len(subdirs))) as ex:
+                list(ex.map(shutil.rmtree, subdirs))
+        os.rmdir(raw_dir)
@@ -1,3 +1,5 @@
+import functools
+
 from utils.paths.base import BasePathConstructor
 from utils.paths.query import QueryPathConstructor
 
@@ -5,6 +7,16 @@ from utils.paths.query import QueryPathConstructor
 class EmbeddingsPathConstructor(BasePathConstructor):
     """Handles embeddings path construction"""
 
+    @functools.cached_property
+    def embeddings_dir(self):
+        """
+        Base directory for embeddings, built once per instance
+
+        Returns:
+            * Path to the embeddings dir
+        """
+        return f"results/embeddings/{self._run_segment}"
+
     def construct_embeddings_dir(self):
         """
         Construct base directory for embeddings
@@ -12,13 +24,7 @@ class EmbeddingsPathConstructor(BasePathConstructor):
         Returns:
             * Path to the embeddings dir
         """
-        base_dir = "results/embeddings"
-
-        return (
-            f"{base_dir}/{self.analysis_type}/{self.species}/"
-            f"{self._atlas_segment}/{self.model}/"
-            f"{self.template_name}/{self._hemisphere_segment}"
-        )
+        return self.embeddings_dir
 
     def construct_embeddings_region_path(
         self, region: str, trial="final",
@@ -34,9 +40,8 @@ class EmbeddingsPathConstructor(BasePathConstructor):
         Returns:
             * Path to the region embedding csv file
         """
-        embeddings_dir = self.construct_embeddings_dir()
         segment = QueryPathConstructor._trial_segment(trial)
-        return f"{embeddings_dir}/{segment}/{region}.csv"
+        return f"{self.embeddings_dir}/{segment}/{region}.csv"
 
     def construct_per_function_embeddings_region_path(
         self, region: str, trial="final",
@@ -52,6 +57,5 @@ class EmbeddingsPathConstructor(BasePathConstructor):
         Returns:
             * Path to the per-function embeddings csv file
         """
-        embeddings_dir = self.construct_embeddings_dir()
         segment = QueryPathConstructor._trial_segment(trial)
-        return f"{embeddings_dir}/{segment}/{region}_per_function.csv"
+        return f"{self.embeddings_dir}/{segment}/{region}_per_function.csv"
@@ -1,6 +1,10 @@
 import datetime
+import functools
 from utils.paths.base import BasePathConstructor, DEFAULT_PATHS
 
+# Taken once at import, so every prompt saved during a run shares a stamp
+_RUN_TIMESTAMP = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
 
 class PromptPathConstructor(BasePathConstructor):
     """Handles prompt and template-related path construction"""
@@ -46,24 +50,24 @@ class PromptPathConstructor(BasePathConstructor):
         Returns:
             * Path to the chosen prompt template
         """
-        prompt_dir = cls.get_prompt_dir(prompt_type=prompt_type)
-        return f"{prompt_dir}/{template_name}.txt"
+        return _template_path(
+            prompt_type=prompt_type, template_name=template_name,
+        )
 
     def construct_results_prompt_path(
-        self, prompt_type: str,
+        self, prompt_type: str, timestamp: str = None,
     ):
         """
         Construct path for saving generated prompts to results
 
         Args:
             * prompt_type: Type of analysis
+            * timestamp: Filename timestamp (default: the run's start time)
 
         Returns:
             * Path to the generated prompt
         """
-        timestamp = datetime.datetime.now().strftime(
-            "%Y%m%d_%H%M%S"
-        )
+        timestamp = timestamp if timestamp else _RUN_TIMESTAMP
         results_dir = self.get_results_prompt_dir(
             prompt_type=prompt_type
         )
@@ -72,3 +76,19 @@ class PromptPathConstructor(BasePathConstructor):
             f"{self._atlas_segment}/{self.template_name}/"
             f"{self._hemisphere_segment}/prompt_{timestamp}.txt"
         )
+
+
+@functools.lru_cache(maxsize=64)
+def _template_path(prompt_type: str, template_name: str) -> str:
+    """
+    Build a template path once per (prompt type, template name)
+
+    Args:
+        * prompt_type: Type of analysis
+        * template_name: Name of the template chosen
+
+    Returns:
+        * Path to the chosen prompt template
+    """
+    prompt_dir = PromptPathConstructor.get_prompt_dir(prompt_type=prompt_type)
+    return f"{prompt_dir}/{template_name}.txt"
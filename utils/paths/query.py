@@ -1,3 +1,5 @@
+import functools
+
 from utils.paths.base import BasePathConstructor
 
 
@@ -5,6 +7,7 @@ class QueryPathConstructor(BasePathConstructor):
     """Handles query results path construction"""
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def _trial_segment(trial):
         """
         Return the path segment for a trial or final result.
@@ -22,6 +25,16 @@ class QueryPathConstructor(BasePathConstructor):
             else f"trial_{trial}"
         )
 
+    @functools.cached_property
+    def query_results_dir(self):
+        """
+        Base directory for query results, built once per instance
+
+        Returns:
+            * Path to the raw query results dir
+        """
+        return f"{self.get_raw_results_dir()}/{self._run_segment}"
+
     def construct_query_results_dir(self):
         """
         Construct base directory for query results
@@ -29,13 +42,7 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the raw query results dir
         """
-        raw_dir = self.get_raw_results_dir()
-
-        return (
-            f"{raw_dir}/{self.analysis_type}/{self.species}/"
-            f"{self._atlas_segment}/{self.model}/"
-            f"{self.template_name}/{self._hemisphere_segment}"
-        )
+        return self.query_results_dir
 
     def construct_query_cleaned_results_dir(self):
         """
@@ -44,8 +51,7 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the cleaned query results dir
         """
-        query_dir = self.construct_query_results_dir()
-        return f"{query_dir}/cleaned"
+        return f"{self.query_results_dir}/cleaned"
 
     def construct_query_trials_dir(self, trial="final"):
         """
@@ -57,9 +63,7 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the trial-specific query results dir
         """
-        query_dir = self.construct_query_results_dir()
-        segment = self._trial_segment(trial=trial)
-        return f"{query_dir}/{segment}"
+        return f"{self.query_results_dir}/{self._trial_segment(trial=trial)}"
 
     def construct_query_justifications_dir(self, trial="final"):
         """
@@ -72,9 +76,8 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the trial-specific justifications dir
         """
-        query_dir = self.construct_query_results_dir()
         segment = self._trial_segment(trial=trial)
-        return f"{query_dir}/justifications/{segment}"
+        return f"{self.query_results_dir}/justifications/{segment}"
 
     def construct_query_region_path(
         self, region: str, trial="final",
@@ -89,7 +92,8 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the region json file
         """
-        return f"{self.construct_query_trials_dir(trial=trial)}/{region}.json"
+        segment = self._trial_segment(trial=trial)
+        return f"{self.query_results_dir}/{segment}/{region}.json"
 
     def construct_query_cleaned_region_path(
         self, region: str, trial="final",
@@ -104,10 +108,8 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the cleaned json region query
         """
-        return (
-            f"{self.construct_query_cleaned_results_dir()}/"
-            f"{self._trial_segment(trial=trial)}/{region}.json"
-        )
+        segment = self._trial_segment(trial=trial)
+        return f"{self.query_results_dir}/cleaned/{segment}/{region}.json"
 
     def construct_query_justification_region_path(
         self, region: str, trial="final",
@@ -122,9 +124,9 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the justification json file
         """
+        segment = self._trial_segment(trial=trial)
         return (
-            f"{self.construct_query_justifications_dir(trial=trial)}/"
-            f"{region}.json"
+            f"{self.query_results_dir}/justifications/{segment}/{region}.json"
         )
 
     def construct_query_pair_path(
@@ -144,8 +146,10 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the pair ranking json file
         """
-        pair = f"{region_1}_vs_{region_2}"
-        return f"{self.construct_query_trials_dir(trial=trial)}/{pair}.json"
+        segment = self._trial_segment(trial=trial)
+        return (
+            f"{self.query_results_dir}/{segment}/{region_1}_vs_{region_2}.json"
+        )
 
     def construct_query_pair_justification_path(
         self,
@@ -164,10 +168,10 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the pair justification json file
         """
-        pair = f"{region_1}_vs_{region_2}"
+        segment = self._trial_segment(trial=trial)
         return (
-            f"{self.construct_query_justifications_dir(trial=trial)}/"
-            f"{pair}.json"
+            f"{self.query_results_dir}/justifications/{segment}/"
+            f"{region_1}_vs_{region_2}.json"
         )
 
     def construct_query_retest_summary_path(
@@ -182,5 +186,4 @@ class QueryPathConstructor(BasePathConstructor):
         Returns:
             * Path to the retest summary json file
         """
-        query_dir = self.construct_query_results_dir()
-        return f"{query_dir}/retest_summary/{region}.json"
+        return f"{self.query_results_dir}/retest_summary/{region}.json"
@@ -1,3 +1,5 @@
+import functools
+
 from utils.paths.base import BasePathConstructor
 
 
@@ -8,13 +10,9 @@ class VisualizationPathConstructor(BasePathConstructor):
     def visualisations_dir(self):
         return "results/visualizations"
 
-    @property
+    @functools.cached_property
     def base_dir(self):
-        return (
-            f"{self.visualisations_dir}/{self.analysis_type}/{self.species}/"
-            f"{self._atlas_segment}/{self.model}/{self.template_name}/"
-            f"{self._hemisphere_segment}"
-        )
+        return f"{self.visualisations_dir}/{self._run_segment}"
 
     def construct_visualisations_similarity_path(
         self, extension: str = "png",
@@ -59,7 +57,10 @@ class VisualizationPathConstructor(BasePathConstructor):
         Returns:
             * Path to the function probability visualization
         """
-        return f"{self.base_dir}/heatmap.{extension}"
+        return (
+            f"{self.base_dir}/{function.replace(' ', '_')}/"
+            f"barplot.{extension}"
+        )
 
     def construct_visualisations_ranking_pair_path(
         self,
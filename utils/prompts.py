@@ -1,17 +1,21 @@
 import os
 import re
 import json
-from glob import glob
-from typing import List
-from pathlib import Path
+import string
+import functools
+from typing import Dict, List, Optional, Tuple
 
 from utils.misc.logging_setup import logger
 from utils.misc.variables import DEFAULT_TEMPLATES, JUSTIFY_OUTPUT_FORMATS
 from utils.paths.prompts import PromptPathConstructor
 
 
+@functools.lru_cache(maxsize=None)
 def create_default_templates():
-    """Create default template files if they don't exist"""
+    """
+    Create default template files if they don't exist. Runs once per
+    process: later calls return immediately
+    """
 
     # Define two prompting types
     tasks = DEFAULT_TEMPLATES.keys()
@@ -41,9 +45,17 @@ def get_available_templates(prompt_type: str) -> List[str]:
         * List of template names (without .txt)
     """
     prompt_dir = PromptPathConstructor.get_prompt_dir(prompt_type=prompt_type)
-    pattern = f"{prompt_dir}/*.txt"
-    files = glob(pattern)
-    return [os.path.splitext(os.path.basename(f))[0] for f in files]
+    try:
+        with os.scandir(prompt_dir) as entries:
+            # Same matches as glob("*.txt"): hidden files are skipped
+            return [
+                e.name[:-4] for e in entries
+                if e.name.endswith(".txt")
+                and not e.name.startswith(".")
+                and e.is_file()
+            ]
+    except FileNotFoundError:
+        return []
 
 
 def load_custom_template(prompt_type: str, template_name: str) -> str:
@@ -63,18 +75,133 @@ def load_custom_template(prompt_type: str, template_name: str) -> str:
     template_path = PromptPathConstructor.construct_template_path(
         prompt_type=prompt_type, template_name=template_name
     )
-    if not os.path.exists(template_path):
+    try:
+        mtime = os.stat(template_path).st_mtime_ns
+    except OSError:
         logger.error(
             f"Template {template_name} for {prompt_type} not found",
             exc_info=True,
         )
         raise
 
-    # Load and return template content
+    # Load template content (cached until the file changes)
+    return _read_template(template_path=template_path, mtime=mtime)
+
+
+@functools.lru_cache(maxsize=64)
+def _read_template(template_path: str, mtime: int) -> str:
+    """
+    Read a template file once for a given modification time
+
+    Args:
+        * template_path: Path to the template file
+        * mtime: File modification time (cache key only)
+
+    Returns:
+        * Template string
+    """
     with open(template_path, "r") as f:
         return f.read()
 
 
+def _compile_template(template: str) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """
+    Parse a template into (literal, field) pairs, so rendering is a join
+    instead of str.format. Not cached itself: it only runs on a
+    _bind_template miss
+
+    Args:
+        * template: Template string with {field} placeholders
+
+    Returns:
+        * Tuple of (literal_text, field_name) pairs (field_name is None for
+            trailing text), or None if the template uses anything beyond plain
+            named fields and must go through str.format
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if spec or conversion or (
+            field is not None
+            and not (field.isidentifier() and field.isascii())
+        ):
+            return None
+        parts.append((literal, field))
+    return tuple(parts)
+
+
+# Fields that stay fixed across a run (one species, one hemisphere), folded
+# into the compiled template so rendering only substitutes the rest
+_BOUND_FIELDS = ("species", "hemisphere_part")
+
+
+@functools.lru_cache(maxsize=256)
+def _bind_template(
+    template: str, bound: Tuple[Tuple[str, str], ...],
+) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """
+    Partially evaluate a compiled template, merging the bound fields' values
+    into the surrounding literal text. Cached per template and bound values,
+    so every distinct prompt of a run (each _build_prompt miss) skips the
+    parse
+
+    Args:
+        * template: Template string with {field} placeholders
+        * bound: (field_name, value) pairs to substitute now
+
+    Returns:
+        * (literal_text, field_name) pairs for the remaining fields, or None
+            if the template must go through str.format
+    """
+    parts = _compile_template(template)
+    if parts is None:
+        return None
+    values = dict(bound)
+    folded = []
+    pending = ""
+    for literal, field in parts:
+        if field is not None and field in values:
+            pending += literal + str(values[field])
+        else:
+            folded.append((pending + literal, field))
+            pending = ""
+    if pending:
+        folded.append((pending, None))
+    return tuple(folded)
+
+
+def _render_template(template: str, format_vars: Dict[str, str]) -> str:
+    """
+    Render a template with precompiled placeholders
+
+    Args:
+        * template: Template string with {field} placeholders
+        * format_vars: Values for each placeholder
+
+    Returns:
+        * Rendered string, identical to template.format(**format_vars)
+    """
+    bound = tuple(
+        (field, format_vars[field])
+        for field in _BOUND_FIELDS if field in format_vars
+    )
+    parts = _bind_template(template, bound)
+    if parts is None:
+        return template.format(**format_vars)
+    return "".join(
+        literal if field is None else literal + str(format_vars[field])
+        for literal, field in parts
+    )
+
+
+# Justify rewrites, compiled once at import
+_NO_EXPLANATIONS_RE = re.compile(
+    r"\d+\.\s*\*\*DO NOT\*\*\s*provide explanations.*?\n"
+)
+_OUTPUT_FORMAT_RE = re.compile(
+    r"### Expected Output Format\s*\n.*", re.DOTALL
+)
+
+
 def _apply_justify(prompt: str, prompt_type: str) -> str:
     """
     Replace the Expected Output Format section and remove the
@@ -88,21 +215,80 @@ def _apply_justify(prompt: str, prompt_type: str) -> str:
         * Modified prompt with justify output format
     """
     # Remove "DO NOT provide explanations" guideline
-    prompt = re.sub(
-        r"\d+\.\s*\*\*DO NOT\*\*\s*provide explanations.*?\n",
-        "",
-        prompt,
-    )
+    prompt = _NO_EXPLANATIONS_RE.sub("", prompt)
 
     # Replace Expected Output Format section
     justify_format = JUSTIFY_OUTPUT_FORMATS[prompt_type]
-    prompt = re.sub(
-        r"### Expected Output Format\s*\n.*",
-        justify_format,
-        prompt,
-        flags=re.DOTALL,
+    prompt = _OUTPUT_FORMAT_RE.sub(justify_format, prompt)
+
+    return prompt
+
+
+def _function_fields(prompt_type, region_name, function, region_1, region_2):
+    """Fields for top-functions prompts: the region only"""
+    return (("region", region_name),)
+
+
+def _probability_fields(
+    prompt_type, region_name, function, region_1, region_2,
+):
+    """Fields for query-functions prompts: region and function"""
+    assert function, f"Function must be provided for {prompt_type} prompts"
+    return (("region", region_name), ("function", function))
+
+
+def _ranking_fields(prompt_type, region_name, function, region_1, region_2):
+    """Fields for ranking prompts: region, function and the region pair"""
+    assert function, f"Function must be provided for {prompt_type} prompts"
+    assert region_1 and region_2, (
+        "region_1 and region_2 must be provided for ranking prompts"
     )
+    return (
+        ("region", region_name), ("function", function),
+        ("region_1", region_1), ("region_2", region_2),
+    )
+
 
+# Prompt wording for the usual hemisphere values; others are formatted
+# on the fly
+_HEMISPHERE_PART = {
+    None: "in the",
+    "left": "in the **left hemisphere** of the",
+    "right": "in the **right hemisphere** of the",
+}
+
+# Per prompt type field builders, picked with one lookup per prompt
+_PROMPT_FIELDS = {
+    "top-functions": _function_fields,
+    "query-functions": _probability_fields,
+    "rankings": _ranking_fields,
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _build_prompt(
+    template: str,
+    prompt_type: str,
+    justify: bool,
+    fields: Tuple[Tuple[str, str], ...],
+) -> str:
+    """
+    Render a prompt from its template and fields. Cached, since every
+    model queried for a region gets the same prompt (and the justify
+    rewrites are skipped too)
+
+    Args:
+        * template: Template string with {field} placeholders
+        * prompt_type: "top-functions", "query-functions", or "rankings"
+        * justify: Whether to include justification request
+        * fields: (field_name, value) pairs for the placeholders
+
+    Returns:
+        * Generated prompt string
+    """
+    prompt = _render_template(template=template, format_vars=dict(fields))
+    if justify:
+        prompt = _apply_justify(prompt=prompt, prompt_type=prompt_type)
     return prompt
 
 
@@ -143,38 +329,28 @@ def generate_prompt(
         prompt_type=prompt_type, template_name=template_name
     )
 
-    # Prepare variables for formatting
-    format_vars = {
-        "species": species,
-        "region": region_name,
-    }
-
     # Handle hemisphere part
-    format_vars["hemisphere_part"] = (
+    hemisphere_part = _HEMISPHERE_PART.get(hemisphere) or (
         f"in the **{hemisphere} hemisphere** of the"
         if hemisphere
         else "in the"
     )
 
-    # Add function for probability and ranking prompts
-    if prompt_type in ("query-functions", "rankings"):
-        assert function, f"Function must be provided for {prompt_type} prompts"
-        format_vars["function"] = function
-
-    # Add region pair for ranking prompts
-    if prompt_type == "rankings":
-        assert region_1 and region_2, (
-            "region_1 and region_2 must be provided for ranking prompts"
-        )
-        format_vars["region_1"] = region_1
-        format_vars["region_2"] = region_2
-
-    # Format template with all replacements at once
-    prompt = template.format(**format_vars)
+    # Collect the prompt type's own fields
+    type_fields = _PROMPT_FIELDS.get(prompt_type, _function_fields)(
+        prompt_type=prompt_type, region_name=region_name,
+        function=function, region_1=region_1, region_2=region_2,
+    )
 
-    # Apply justify modifications if requested
-    if justify:
-        prompt = _apply_justify(prompt=prompt, prompt_type=prompt_type)
+    # Format template (and apply justify modifications if requested)
+    prompt = _build_prompt(
+        template=template, prompt_type=prompt_type, justify=justify,
+        fields=(
+            ("species", species),
+            ("hemisphere_part", hemisphere_part),
+            *type_fields,
+        ),
+    )
 
     # Save if requested
     if save_to_results:
@@ -192,6 +368,68 @@ def generate_prompt(
     return prompt
 
 
+# Results prompt directories already known to hold a saved prompt
+_dirs_with_prompt = set()
+
+
+def _has_saved_prompt(results_dirname: str) -> bool:
+    """
+    Check whether a results prompt directory already holds a prompt,
+    creating the directory if needed. Only the first check per directory
+    scans it; once a prompt is seen the answer is remembered
+
+    Args:
+        * results_dirname: Results prompt directory
+
+    Returns:
+        * True if a prompt_*.txt file exists in the directory
+    """
+    if results_dirname in _dirs_with_prompt:
+        return True
+    os.makedirs(results_dirname, exist_ok=True)
+    with os.scandir(results_dirname) as entries:
+        found = any(
+            e.name.startswith("prompt_") and e.name.endswith(".txt")
+            for e in entries
+        )
+    if found:
+        _dirs_with_prompt.add(results_dirname)
+    return found
+
+
+@functools.lru_cache(maxsize=256)
+def _results_prompt_path(
+    prompt_type: str,
+    species: str,
+    atlas_name: str,
+    hemisphere: Optional[str],
+    template_name: str,
+) -> str:
+    """
+    Build the results prompt path once per run configuration (the
+    timestamp is fixed for the run, so the path is too)
+
+    Args:
+        * prompt_type: Type of analysis
+        * species: Species name
+        * atlas_name: Atlas name
+        * hemisphere: Hemisphere ("left"/"right"/None)
+        * template_name: Template name used
+
+    Returns:
+        * Path to the generated prompt
+    """
+    prompt_paths = PromptPathConstructor(
+        species=species,
+        atlas_name=atlas_name,
+        hemisphere=hemisphere if hemisphere else "no_separation",
+        template_name=template_name,
+    )
+    return prompt_paths.construct_results_prompt_path(
+        prompt_type=prompt_type,
+    )
+
+
 def save_generated_prompt(
     prompt: str,
     prompt_type: str,
@@ -216,30 +454,29 @@ def save_generated_prompt(
         * function: Function name (for probability prompts)
     """
     # Construct the results prompt path
-    prompt_paths = PromptPathConstructor(
-        species=species,
-        atlas_name=atlas_name,
-        hemisphere=hemisphere if hemisphere else "no_separation",
-        template_name=template_name,
+    results_prompt_path = _results_prompt_path(
+        prompt_type=prompt_type, species=species, atlas_name=atlas_name,
+        hemisphere=hemisphere, template_name=template_name,
     )
-    results_prompt_path = prompt_paths.construct_results_prompt_path(
-        prompt_type=prompt_type,
-    )
-
-    # Ensure directory exists
-    results_dirname = os.path.dirname(results_prompt_path)
-    os.makedirs(results_dirname, exist_ok=True)
 
     # Check if we already have a prompt saved (avoid duplicates)
-    if glob(f"{results_dirname}/prompt_*.txt"):
+    results_dirname = os.path.dirname(results_prompt_path)
+    if _has_saved_prompt(results_dirname=results_dirname):
         return
 
-    # Save new prompt
-    with open(results_prompt_path, "w") as f:
-        f.write(prompt)
+    # Save new prompt. Exclusive create, so when concurrent tasks race to
+    # save the run's prompt only the first writes it (and its metadata)
+    try:
+        with open(results_prompt_path, "x") as f:
+            f.write(prompt)
+    except FileExistsError:
+        _dirs_with_prompt.add(results_dirname)
+        return
+    _dirs_with_prompt.add(results_dirname)
 
     # Save metadata
-    results_timestamp = Path(results_prompt_path).stem.replace("prompt_", "")
+    results_without_ext = results_prompt_path.removesuffix(".txt")
+    results_timestamp = results_without_ext.rpartition("prompt_")[2]
     metadata = {
         "template": template_name,
         "species": species,
@@ -251,6 +488,9 @@ def save_generated_prompt(
     }
 
     # Save metadata alongside prompt
-    results_without_ext = os.path.splitext(results_prompt_path)[0]
-    with open(f"{results_without_ext}_metadata.json", "w") as f:
-        json.dump(metadata, f, indent=2)
+    with open(
+        f"{results_without_ext}_metadata.json", "w", encoding="utf-8"
+    ) as f:
+        f.write(
+            json.dumps(metadata, separators=(",", ":"), ensure_ascii=False)
+        )